@@ -0,0 +1,209 @@
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Matriks kasus default: adegan x karakter x orientasi x kata per adegan.
+DEFAULT_SCENES = [4, 12]
+DEFAULT_CHARACTERS = [2, 4]
+DEFAULT_ORIENTATIONS = ["9:16", "16:9"]
+DEFAULT_WORDS = [4, 12]
+# Sebuah tahap dianggap regresi jika lebih lambat dari baseline sebesar fraksi ini...
+DEFAULT_THRESHOLD = 0.25
+# ...dan selisihnya melebihi angka ini (detik), agar derau pada tahap cepat diabaikan.
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def parse_list(value, cast=int):
+    return [cast(v) for v in value.split(",") if v]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss dalam KB di Linux dan dalam byte di macOS.
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def case_name(scenes, char_count, orientation, words, quality="final"):
+    name = f"s{scenes}-c{char_count}-{orientation.replace(':', 'x')}-w{words}"
+    return name if quality == "final" else f"{name}-{quality}"
+
+
+def run_case(scenes, char_count, orientation, words, workers, characters_path, quality="final"):
+    """
+    Menjalankan seluruh pipeline untuk satu kasus sintetis dan mengukur setiap
+    tahap. Dipanggil di proses baru per kasus, sehingga import, cache proses,
+    dan puncak RSS tidak terbawa dari kasus sebelumnya.
+    """
+    import main
+    from benchmarks.synthetic import register_tone_backend, synthetic_script
+    from scripts import cache, raster_cache, sprite_atlas
+    from scripts.render_frames_pipe import clear_process_caches
+
+    with open(characters_path, encoding="utf-8") as f:
+        characters_data = json.load(f)
+    characters_data = dict(characters_data, characters=characters_data["characters"][:char_count])
+    char_ids = [c["id"] for c in characters_data["characters"]]
+    script = synthetic_script(scenes, char_ids, words)
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    # Cache di disk (audio, raster SVG, atlas sprite) terpisah per kasus agar
+    # setiap tahap diukur tanpa cache, tidak bergantung pada isi cache/ milik
+    # repo maupun ulangan sebelumnya. Worker render (fork) mewarisi path ini.
+    cache.AUDIO_CACHE_DIR = os.path.join(workdir, "audio_cache")
+    raster_cache.RASTER_CACHE_DIR = os.path.join(workdir, "rasters")
+    sprite_atlas.ATLAS_DIR = os.path.join(workdir, "atlas")
+    job = main.PipelineJob(script, characters_data, workdir, orientation, workers=workers,
+                           assembly="two-step", tts_backend=register_tone_backend(), quality=quality)
+    # Template SVG, latar belakang & sprite dari pemanggilan sebelumnya (jika
+    # run_case dipanggil di proses yang sama) tidak boleh ikut terukur.
+    clear_process_caches()
+    timings = {}
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            for stage in main.STAGES:
+                start = time.perf_counter()
+                main.STAGE_FUNCTIONS[stage](job)
+                timings[stage] = time.perf_counter() - start
+        frames = job.schedule.total_frames
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "case": case_name(scenes, char_count, orientation, words, quality),
+        "scenes": scenes,
+        "characters": char_count,
+        "orientation": orientation,
+        "words": words,
+        "quality": quality,
+        "width": job.timeline["width"],
+        "height": job.timeline["height"],
+        "frames": frames,
+        "seconds": round(frames / job.schedule.fps, 3),
+        "stages": timings,
+        "render_fps": frames / timings["render"] if timings["render"] > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_children_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def best_of(results):
+    """Menggabungkan beberapa ulangan satu kasus: waktu tercepat per tahap, RSS tertinggi."""
+    best = dict(results[0])
+    best["stages"] = {stage: min(r["stages"][stage] for r in results) for stage in results[0]["stages"]}
+    best["render_fps"] = max((r["render_fps"] or 0) for r in results) or None
+    best["peak_rss_mb"] = max(r["peak_rss_mb"] for r in results)
+    best["peak_children_rss_mb"] = max(r["peak_children_rss_mb"] for r in results)
+    return best
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Membandingkan waktu per tahap dengan baseline. Mengembalikan daftar pesan regresi."""
+    baseline_cases = {r["case"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = baseline_cases.get(result["case"])
+        if base is None:
+            continue
+        for stage, seconds in result["stages"].items():
+            base_seconds = base["stages"].get(stage)
+            if base_seconds is None:
+                continue
+            if seconds > base_seconds * (1 + threshold) and seconds - base_seconds > MIN_REGRESSION_SECONDS:
+                regressions.append(
+                    f"{result['case']} / {stage}: {seconds:.3f}s vs baseline {base_seconds:.3f}s "
+                    f"(+{(seconds / base_seconds - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def print_summary(results):
+    stages = list(results[0]["stages"]) if results else []
+    header = f"{'kasus':<22}{'frame':>7}{'fps':>8}" + "".join(f"{s:>10}" for s in stages) + f"{'RSS MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        fps = f"{r['render_fps']:.1f}" if r["render_fps"] else "-"
+        row = f"{r['case']:<22}{r['frames']:>7}{fps:>8}"
+        row += "".join(f"{r['stages'][s]:>10.3f}" for s in stages)
+        print(row + f"{r['peak_rss_mb']:>9.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline render dengan timeline sintetis (tanpa jaringan).")
+    parser.add_argument("--scenes", type=parse_list, default=DEFAULT_SCENES, help="Jumlah adegan, dipisah koma")
+    parser.add_argument("--characters", type=parse_list, default=DEFAULT_CHARACTERS,
+                        help="Jumlah karakter di panggung, dipisah koma")
+    parser.add_argument("--orientations", type=lambda v: parse_list(v, str), default=DEFAULT_ORIENTATIONS,
+                        help="Orientasi, dipisah koma (9:16,16:9)")
+    parser.add_argument("--words", type=parse_list, default=DEFAULT_WORDS,
+                        help="Rata-rata kata per adegan (menentukan durasi), dipisah koma")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses render")
+    parser.add_argument("--quality", default="final", choices=["draft", "final"], help="Tingkat kualitas render")
+    parser.add_argument("--repeat", type=int, default=1, help="Ulangan per kasus; waktu tercepat yang dilaporkan")
+    parser.add_argument("--characters-file", default="characters.json")
+    parser.add_argument("--output", default="bench_results.json", help="File JSON hasil benchmark")
+    parser.add_argument("--baseline", help="File JSON hasil sebelumnya untuk deteksi regresi")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Batas perlambatan relatif per tahap sebelum dianggap regresi")
+    args = parser.parse_args(argv)
+
+    import main as pipeline
+    pipeline.require_ffmpeg()
+
+    cases = list(itertools.product(args.scenes, args.characters, args.orientations, args.words))
+    results = []
+    for scenes, char_count, orientation, words in cases:
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            # Satu proses baru per ulangan (spawn) dengan direktori cache kosong
+            # (lihat run_case) agar setiap pengukuran dimulai dingin.
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                runs.append(pool.submit(run_case, scenes, char_count, orientation, words,
+                                        args.workers, args.characters_file, args.quality).result())
+        result = best_of(runs)
+        results.append(result)
+        print(f"⏱️ {result['case']}: {result['frames']} frame, render {result['stages']['render']:.2f}s")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "repeat": args.repeat,
+            "quality": args.quality,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print()
+    print_summary(results)
+    print(f"\n📄 Hasil disimpan di {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print("\n❌ Regresi terdeteksi:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print("\n✅ Tidak ada regresi dibanding baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
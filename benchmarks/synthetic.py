@@ -0,0 +1,50 @@
+import hashlib
+
+import numpy as np
+
+from scripts.tts_audio import TTS_BACKENDS, TTS_SAMPLE_RATE
+
+# Kosakata naskah sintetis; panjang kalimat menentukan durasi adegan.
+WORDS = [
+    "halo", "apa", "kabar", "hari", "ini", "cuaca", "cerah", "sekali", "ayo", "kita",
+    "pergi", "ke", "pasar", "membeli", "sayur", "dan", "buah", "segar", "untuk", "makan",
+]
+# Nama emosi seperti yang ditulis pengguna di naskah.
+EMOTIONS = ["Netral", "Senang", "Sedih", "Berpikir", "Marah", "Terkejut"]
+# Durasi ucapan per kata dari backend nada.
+TONE_SECONDS_PER_WORD = 0.3
+TONE_BACKEND = "tone"
+
+
+def synthetic_script(scene_count, char_ids, words_per_scene):
+    """
+    Naskah deterministik dengan `scene_count` adegan yang bergiliran diucapkan
+    oleh `char_ids`. Panjang kalimat berselang-seling antara setengah, satu, dan
+    satu setengah kali `words_per_scene` agar durasi adegan bervariasi.
+    """
+    scenes = []
+    for i in range(scene_count):
+        speaker = char_ids[i % len(char_ids)]
+        emotion = EMOTIONS[i % len(EMOTIONS)]
+        length = max(1, int(words_per_scene * (0.5 + 0.5 * (i % 3))))
+        text = " ".join(WORDS[(i + j) % len(WORDS)] for j in range(length))
+        scenes.append(f"[{speaker}: {emotion}]\n{text.capitalize()}.")
+    return "\n\n".join(scenes)
+
+
+def tone_synthesize(text, lang):
+    """
+    Pengganti TTS tanpa jaringan: nada sinus dengan frekuensi dari hash teks dan
+    amplitudo bergelombang per suku kata, sehingga lip sync tetap punya variasi.
+    """
+    digest = hashlib.sha256(f"{lang}:{text}".encode("utf-8")).digest()
+    frequency = 140 + digest[0] % 120
+    duration = TONE_SECONDS_PER_WORD * max(1, len(text.split()))
+    t = np.arange(int(duration * TTS_SAMPLE_RATE)) / TTS_SAMPLE_RATE
+    syllables = np.abs(np.sin(np.pi * t * 4))
+    return (np.sin(2 * np.pi * frequency * t) * syllables * 12000).astype(np.int16)
+
+
+def register_tone_backend():
+    TTS_BACKENDS.setdefault(TONE_BACKEND, tone_synthesize)
+    return TONE_BACKEND
@@ -1,7 +1,10 @@
 
 import os
+import sys
 import json
-import subprocess
+import uuid
+import shutil
+import asyncio
 import logging
 
 from telegram import (
@@ -36,6 +39,21 @@ AVAILABLE_EMOTIONS = ["neutral", "sad", "happy", "thinking", "angry", "surprised
 USER_FACING_EMOTIONS = ["Marah", "Sedih", "Senang", "Berpikir", "Terkejut", "Netral"]
 
 
+# Jumlah render yang boleh berjalan bersamaan; job lain menunggu di antrean.
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", 2))
+# Setiap job render mendapat direktori kerja sendiri di bawah folder ini.
+JOBS_DIR = "jobs"
+# Jika aktif, setiap worker memakai render daemon yang tetap hangat
+# (scripts/render_daemon.py) alih-alih menjalankan main.py baru per job.
+USE_RENDER_DAEMON = os.environ.get("RENDER_DAEMON", "1") != "0"
+RENDER_DAEMON_MAX_JOBS = int(os.environ.get("RENDER_DAEMON_MAX_JOBS", 50))
+RENDER_DAEMON_MAX_RSS_MB = int(os.environ.get("RENDER_DAEMON_MAX_RSS_MB", 1536))
+# Jika diisi, setiap render mencatat trace ke folder ini (satu file JSON per job).
+RENDER_TRACE_DIR = os.environ.get("RENDER_TRACE_DIR")
+# Batas waktu menunggu daemon yang baru dijalankan membuka socket-nya (detik).
+RENDER_DAEMON_START_TIMEOUT = 30
+
+
 # ===== STATE =====
 USER_STATE = {}
 
@@ -60,6 +78,7 @@ async def send_timeline_preview(chat_id, context):
         keyboard.append(scene_buttons[i:i+2])
 
     keyboard.append([
+        InlineKeyboardButton("⚡ Draft", callback_data="render:draft"),
         InlineKeyboardButton("🎬 Render", callback_data="render"),
         InlineKeyboardButton("❌ Batal", callback_data="cancel")
     ])
@@ -71,6 +90,121 @@ async def send_timeline_preview(chat_id, context):
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
+# ===== RENDER QUEUE =====
+def create_job_workspace(script, timeline):
+    """Membuat direktori kerja terisolasi berisi naskah & timeline untuk satu job render."""
+    workdir = os.path.join(JOBS_DIR, uuid.uuid4().hex)
+    os.makedirs(workdir)
+    with open(os.path.join(workdir, "timeline.json"), "w", encoding="utf-8") as f:
+        json.dump(timeline, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(workdir, "script.txt"), "w", encoding="utf-8") as f:
+        f.write(script)
+    return workdir
+
+class RenderDaemon:
+    """Klien untuk satu render daemon; daemon dijalankan ulang otomatis jika berhenti."""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.process = None
+
+    async def ensure_running(self):
+        if self.process is not None and self.process.returncode is None:
+            return
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "scripts.render_daemon", "--socket", self.socket_path,
+            "--max-jobs", str(RENDER_DAEMON_MAX_JOBS), "--max-rss-mb", str(RENDER_DAEMON_MAX_RSS_MB)
+        )
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + RENDER_DAEMON_START_TIMEOUT
+        while True:
+            await self.ensure_running()
+            try:
+                return await asyncio.open_unix_connection(self.socket_path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # Daemon baru mulai atau sedang didaur ulang.
+                if loop.time() > deadline:
+                    raise RuntimeError("Render daemon tidak merespons.")
+                await asyncio.sleep(0.1)
+
+    async def run(self, args):
+        """Mengirim satu job ke daemon. Mengembalikan (berhasil, log)."""
+        reader, writer = await self.connect()
+        try:
+            writer.write(json.dumps({"args": args}).encode("utf-8") + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        if not line:
+            return False, "Render daemon berhenti di tengah job."
+        result = json.loads(line)
+        return result["ok"], result["log"]
+
+async def run_main_subprocess(args):
+    """Menjalankan main.py sebagai proses baru tanpa memblokir event loop. Mengembalikan (berhasil, log)."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "main.py", *args,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+    )
+    output, _ = await process.communicate()
+    return process.returncode == 0, output.decode("utf-8", errors="replace")
+
+async def run_render_job(bot, job, daemon=None):
+    """Merender satu job (lewat daemon jika ada), lalu mengirim hasilnya."""
+    chat_id, workdir = job["chat_id"], job["workdir"]
+    quality = job.get("quality", "final")
+    # Pengguna sering merender ulang naskah yang sama setelah mengedit satu adegan.
+    args = ["render", "--workdir", workdir, "--incremental", "--quality", quality, "--pipe-format", "yuv420p"]
+    if RENDER_TRACE_DIR:
+        os.makedirs(RENDER_TRACE_DIR, exist_ok=True)
+        args += ["--trace", os.path.join(RENDER_TRACE_DIR, f"{os.path.basename(workdir)}.json")]
+    try:
+        if daemon is not None:
+            ok, log = await daemon.run(args)
+        else:
+            ok, log = await run_main_subprocess(args)
+
+        if not ok:
+            logger.error(f"Render failed for chat {chat_id}: {log}")
+            await bot.send_message(chat_id, f"❌ Render gagal.\nLogs:\n{log[-1000:]}")
+            return
+
+        logger.info(f"Render successful for chat {chat_id}: {log}")
+        await bot.send_message(chat_id, "✅ Render selesai! Mengirim video...")
+        caption = "Pratinjau draft. Tekan 🎬 Render untuk kualitas penuh." if quality == "draft" else "Video Anda sudah jadi!"
+        with open(os.path.join(workdir, "output", "video.mp4"), "rb") as video:
+            await bot.send_video(chat_id=chat_id, video=video, caption=caption)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+async def render_worker(application, worker_id):
+    """Mengambil job dari antrean satu per satu; RENDER_WORKERS worker berjalan paralel."""
+    queue = application.bot_data["render_queue"]
+    daemon = None
+    if USE_RENDER_DAEMON:
+        daemon = RenderDaemon(os.path.join(JOBS_DIR, f"render-{worker_id}.sock"))
+        await daemon.ensure_running()
+    while True:
+        job = await queue.get()
+        try:
+            await run_render_job(application.bot, job, daemon)
+        except Exception as e:
+            logger.error(f"Render worker {worker_id} failed on job {job['workdir']}: {e}", exc_info=True)
+            await application.bot.send_message(job["chat_id"], "❌ Terjadi kesalahan saat merender. Silakan coba lagi.")
+        finally:
+            queue.task_done()
+
+async def start_render_workers(application):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    application.bot_data["render_queue"] = asyncio.Queue()
+    for worker_id in range(max(1, RENDER_WORKERS)):
+        application.create_task(render_worker(application, worker_id))
+    logger.info(f"{max(1, RENDER_WORKERS)} render worker siap.")
+
 # ===== COMMAND HANDLERS =====
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Mengirim pesan selamat datang saat perintah /start dikeluarkan."""
@@ -229,28 +363,28 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.edit_message_text("❌ Dibatalkan.")
 
             elif data == "render":
-                await query.edit_message_text("⏳ *Rendering video...*\nIni mungkin memakan waktu beberapa menit.", parse_mode="Markdown")
-                
-                # Simpan timeline dan naskah mentah ke file agar bisa dibaca oleh main.py
-                with open("timeline.json", "w", encoding="utf-8") as f:
-                    json.dump(state["timeline"], f, indent=2, ensure_ascii=False)
-                
-                with open("script.txt", "w", encoding="utf-8") as f:
-                    f.write(state["script"])
+                # Simpan timeline dan naskah mentah ke direktori job sendiri agar
+                # render dari beberapa pengguna tidak saling menimpa.
+                workdir = create_job_workspace(state["script"], state["timeline"])
+                USER_STATE.pop(chat_id, None)
 
-                try:
-                    process = subprocess.run(
-                        ["python", "main.py", "render"], 
-                        check=True, capture_output=True, text=True, encoding='utf-8'
-                    )
-                    logger.info(f"Render successful for chat {chat_id}: {process.stdout}")
-                    await query.edit_message_text("✅ Render selesai! Mengirim video...")
-                    await context.bot.send_video(chat_id=chat_id, video=open("output/video.mp4", "rb"), caption="Video Anda sudah jadi!")
-                except subprocess.CalledProcessError as e:
-                    logger.error(f"Render failed for chat {chat_id}: STDERR: {e.stderr} STDOUT: {e.stdout}")
-                    await context.bot.send_message(chat_id, f"❌ Render gagal.\nLogs:\n{e.stderr[-1000:]}")
-                finally:
-                     USER_STATE.pop(chat_id, None)
+                queue = context.application.bot_data["render_queue"]
+                await queue.put({"chat_id": chat_id, "workdir": workdir, "quality": "final"})
+                await query.edit_message_text(
+                    f"⏳ *Rendering video...*\nPosisi antrean: {queue.qsize()}. Ini mungkin memakan waktu beberapa menit.",
+                    parse_mode="Markdown"
+                )
+
+            elif data == "render:draft":
+                # Draft hanya pratinjau: state & tombol dipertahankan agar pengguna
+                # bisa mengedit lagi atau langsung merender kualitas penuh.
+                workdir = create_job_workspace(state["script"], state["timeline"])
+
+                queue = context.application.bot_data["render_queue"]
+                await queue.put({"chat_id": chat_id, "workdir": workdir, "quality": "draft"})
+                await context.bot.send_message(
+                    chat_id, f"⚡ Merender pratinjau draft... Posisi antrean: {queue.qsize()}."
+                )
     
     except Exception as e:
         logger.error(f"An error occurred in on_button for chat {chat_id}: {e}", exc_info=True)
@@ -261,7 +395,7 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
         USER_STATE.pop(chat_id, None)
 
 def main():
-    app = Application.builder().token(BOT_TOKEN).build()
+    app = Application.builder().token(BOT_TOKEN).post_init(start_render_workers).build()
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("emotion", emotion_list))
     app.add_handler(CommandHandler("characters", characters_list))
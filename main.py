@@ -1,165 +1,365 @@
 import os
-import sys
 import json
+import argparse
 import subprocess
 import shutil
-from gtts import gTTS
-
-# --- Persiapan Awal ---
-OUTPUT_DIR = "output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Memeriksa apakah ffmpeg & ffprobe terinstal
-if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
-    raise RuntimeError("ffmpeg dan ffprobe tidak ditemukan. Harap instal FFmpeg dan pastikan berada di PATH sistem Anda.")
-
-MODE = sys.argv[1] if len(sys.argv) > 1 else "render"
-
-# --- Memuat File Sumber ---
-if not os.path.exists("script.txt"):
-    raise FileNotFoundError("File script.txt tidak ditemukan.")
-with open("script.txt", encoding="utf-8") as f:
-    text = f.read().strip()
-if not text:
-    raise ValueError("Naskah kosong")
-
-if not os.path.exists("characters.json"):
-    raise FileNotFoundError("File characters.json tidak ditemukan.")
-with open("characters.json", encoding="utf-8") as f:
-    characters_data = json.load(f)
-characters_map = {char['id']: char for char in characters_data['characters']}
-
-# --- Analisis atau Muat Timeline ---
-if os.path.exists("timeline.json") and MODE != "analyze":
-    with open("timeline.json", encoding="utf-8") as f:
-        timeline = json.load(f)
-else:
-    from scripts.analyze_text import analyze
-    timeline = analyze(text, '9:16')
-
-# --- Atur Resolusi & Latar Belakang ---
-print("🔧 Mengatur resolusi, latar belakang, dan karakter...")
-orientation = timeline.get('orientation', '9:16')
-if orientation == '16:9':
-    W, H = 1280, 720
-    print(f"   -> Orientasi Lanskap (16:9) terdeteksi. Resolusi diatur ke {W}x{H}.")
-else:
-    W, H = 720, 1280
-    print(f"   -> Orientasi Potret (9:16) terdeteksi. Resolusi diatur ke {W}x{H}.")
-timeline['width'] = W
-timeline['height'] = H
-timeline["background"] = characters_data.get("background")
-if not timeline["background"]:
-    print("   -> PERINGATAN: Tidak ada path latar belakang ditemukan di characters.json!")
-else:
-    print(f"   -> Latar belakang diatur ke: {timeline['background']}")
-timeline["characters"] = characters_data["characters"]
-
-# --- Mode Analisis (Hanya Bot) ---
-if MODE == "analyze":
-    with open("timeline.json", "w", encoding="utf-8") as f:
-        json.dump(timeline, f, indent=2, ensure_ascii=False)
-    print("Analisis selesai. Timeline disimpan.")
-    sys.exit(0)
+
+from scripts import trace
+
+# Modul berat (gTTS, cairosvg, PIL, numpy) baru diimpor di dalam tahap yang
+# membutuhkannya, sehingga `--help` dan mode analisis langsung berjalan.
+
+# --- Tahap Pipeline (sesuai urutan) ---
+STAGES = ("analyze", "audio", "validate", "subtitles", "render", "mux")
+# Tahap yang membutuhkan ffmpeg di PATH.
+FFMPEG_STAGES = {"audio", "render", "mux"}
+
+DEFAULT_ORIENTATION = "9:16"
+DEFAULT_TTS_CONCURRENCY = 4
+DEFAULT_TTS_BACKEND = "gtts"
+# Resolusi jika timeline tidak menyebutkan width/height (sama dengan analyze_text).
+DEFAULT_RESOLUTIONS = {"9:16": (1080, 1920), "16:9": (1920, 1080)}
+
+# Tingkat kualitas render. "final" memakai resolusi & fps timeline apa adanya;
+# "draft" untuk pratinjau cepat: setengah resolusi, 12 fps, dan preset x264 tercepat.
+QUALITY_TIERS = {
+    "draft": {"scale": 0.5, "fps": 12, "preset": "ultrafast"},
+    "final": {"scale": 1.0, "fps": None, "preset": None},
+}
+DEFAULT_QUALITY = "final"
+# Format piksel frame di pipe ke ffmpeg: yuv420p memangkas data pipe ~60% dan
+# konversi warna dikerjakan Python hanya pada area yang berubah.
+PIPE_FORMATS = ("rgba", "yuv420p")
+DEFAULT_PIPE_FORMAT = "rgba"
+
+def require_ffmpeg():
+    """Memeriksa apakah ffmpeg terinstal."""
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg tidak ditemukan. Harap instal FFmpeg dan pastikan berada di PATH sistem Anda.")
+
+def scaled_resolution(width, height, scale):
+    """Resolusi setelah diskalakan, dibulatkan ke bilangan genap (syarat yuv420p)."""
+    return max(2, round(width * scale / 2) * 2), max(2, round(height * scale / 2) * 2)
+
+def render_resolutions():
+    """Semua resolusi render bawaan: setiap orientasi di setiap tingkat kualitas."""
+    resolutions = []
+    for width, height in DEFAULT_RESOLUTIONS.values():
+        for tier in QUALITY_TIERS.values():
+            resolution = scaled_resolution(width, height, tier["scale"])
+            if resolution not in resolutions:
+                resolutions.append(resolution)
+    return resolutions
+
+class PipelineJob:
+    """
+    State satu job pipeline: naskah, data karakter, opsi render, path keluaran
+    di dalam `workdir`, dan timeline yang diperbarui oleh setiap tahap.
+    """
+
+    def __init__(self, script, characters_data, workdir=".", orientation=None, timeline=None,
+                 workers=1, segments=None, tts_concurrency=DEFAULT_TTS_CONCURRENCY, assembly="single",
+                 incremental=False, tts_backend=DEFAULT_TTS_BACKEND, quality=DEFAULT_QUALITY,
+                 pipe_format=DEFAULT_PIPE_FORMAT, puppet=False):
+        if quality not in QUALITY_TIERS:
+            raise ValueError(f"Tingkat kualitas tidak dikenal: {quality}")
+        if pipe_format not in PIPE_FORMATS:
+            raise ValueError(f"Format pipe tidak dikenal: {pipe_format}")
+        self.script = script
+        self.characters_data = characters_data
+        self.characters_map = {char['id']: char for char in characters_data['characters']}
+        self.orientation = orientation
+        self.timeline = timeline
+        self.workers = workers
+        self.segments = segments
+        self.tts_concurrency = tts_concurrency
+        self.assembly = assembly
+        self.incremental = incremental
+        self.tts_backend = tts_backend
+        self.quality = quality
+        self.pipe_format = pipe_format
+        self.puppet = puppet
+
+        self.workdir = workdir
+        self.timeline_path = os.path.join(workdir, "timeline.json")
+        self.output_dir = os.path.join(workdir, "output")
+        self.audio_path = os.path.join(self.output_dir, "audio.wav")
+        self.subtitles_path = os.path.join(self.output_dir, "subtitles.ass")
+        self.video_noaudio_path = os.path.join(self.output_dir, "video_noaudio.mp4")
+        self.video_path = os.path.join(self.output_dir, "video.mp4")
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Diisi tahap render: True jika audio & subtitle sudah ikut di-encode,
+        # dan True jika hanya subtitle yang sudah di-burn (mode inkremental).
+        self.muxed = False
+        self.subtitles_burned = False
+        self._schedule = None
+
+    @property
+    def schedule(self):
+        """Jadwal frame (fps dari timeline), dihitung sekali dan dipakai bersama oleh video & subtitle."""
+        if self._schedule is None:
+            from scripts.scene_schedule import SceneSchedule
+            self._schedule = SceneSchedule.from_timeline(self.timeline)
+        return self._schedule
+
+    def save_timeline(self):
+        with open(self.timeline_path, "w", encoding="utf-8") as f:
+            json.dump(self.timeline, f, indent=2, ensure_ascii=False)
 
 # =============================================================================
-# --- PEMROSESAN AUDIO DENGAN KONTROL NADA (PITCH) ---
+# --- TAHAP-TAHAP PIPELINE ---
 # =============================================================================
-print("📢 Menghasilkan audio dengan nada spesifik per karakter...")
-
-processed_wav_files = []
-character_pitches = {char_id: data.get("pitch", 1.0) for char_id, data in characters_map.items()}
-
-try:
-    for i, scene in enumerate(timeline["scenes"]):
-        speaker = scene.get("speaker")
-        if not speaker or not scene.get("text"):
-            scene["duration"] = 0.0
-            continue
-
-        print(f"  - Memproses adegan {i+1}/{len(timeline['scenes'])}: {speaker}...")
-
-        temp_mp3 = os.path.join(OUTPUT_DIR, f"_temp_{i}.mp3")
-        tts = gTTS(scene["text"], lang="id", slow=False)
-        tts.save(temp_mp3)
-
-        pitch = character_pitches.get(speaker, 1.0)
-        temp_wav = os.path.join(OUTPUT_DIR, f"_temp_{i}.wav")
-
-        # FALLBACK: Kembali ke `asetrate` karena `rubberband` tidak tersedia.
-        # Kualitas mungkin sedikit lebih rendah, tetapi ini lebih kompatibel.
-        # gTTS menghasilkan audio pada 24kHz.
-        ffmpeg_cmd = [
-            "ffmpeg", "-y", "-i", temp_mp3,
-            "-filter:a", f"asetrate=24000*{pitch},atempo={1/pitch}",
-            temp_wav
-        ]
-        subprocess.run(ffmpeg_cmd, check=True, capture_output=True)
-        processed_wav_files.append(temp_wav)
-
-        ffprobe_cmd = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", temp_wav
-        ]
-        duration_result = subprocess.run(ffprobe_cmd, check=True, capture_output=True, text=True)
-        scene["duration"] = float(duration_result.stdout.strip())
-
-        os.remove(temp_mp3)
-
-    print("  - Menggabungkan semua klip audio...")
-    final_audio_path = os.path.join(OUTPUT_DIR, "audio.wav")
-    
-    # Buat daftar file untuk digabungkan
-    concat_list_path = os.path.join(OUTPUT_DIR, "concat_list.txt")
-    with open(concat_list_path, "w", encoding="utf-8") as f:
-        for wav_file in processed_wav_files:
-            # Gunakan path relatif terhadap CWD dari proses ffmpeg
-            f.write(f"file '{os.path.basename(wav_file)}'\n")
-    
-    concat_cmd = [
-        "ffmpeg", "-y", "-f", "concat", "-safe", "0",
-        "-i", os.path.basename(concat_list_path),
-        "-c", "copy", os.path.basename(final_audio_path)
-    ]
-    # Jalankan perintah ffmpeg dari dalam direktori output
-    subprocess.run(concat_cmd, check=True, capture_output=True, cwd=OUTPUT_DIR)
-
-finally:
-    print("  - Membersihkan file audio sementara...")
-    if 'concat_list_path' in locals() and os.path.exists(concat_list_path):
-        os.remove(concat_list_path)
-    for wav_file in processed_wav_files:
-        if os.path.exists(wav_file):
-            os.remove(wav_file)
+def stage_analyze(job):
+    """
+    Menganalisis naskah (jika belum ada timeline) lalu mengatur resolusi, fps,
+    latar belakang, dan karakter. Resolusi & fps timeline dipakai apa adanya,
+    kemudian disesuaikan dengan tingkat kualitas job.
+    """
+    if job.timeline is None:
+        from scripts.analyze_text import analyze
+        timeline = analyze(job.script, job.orientation or DEFAULT_ORIENTATION)
+    else:
+        # Salinan dangkal: timeline milik pemanggil tidak ikut diubah tingkat kualitas.
+        timeline = dict(job.timeline)
+
+    print("🔧 Mengatur resolusi, latar belakang, dan karakter...")
+    if not timeline.get('width') or not timeline.get('height'):
+        orientation = job.orientation or DEFAULT_ORIENTATION
+        timeline['width'], timeline['height'] = DEFAULT_RESOLUTIONS.get(orientation, DEFAULT_RESOLUTIONS[DEFAULT_ORIENTATION])
+    tier = QUALITY_TIERS[job.quality]
+    timeline['width'], timeline['height'] = scaled_resolution(timeline['width'], timeline['height'], tier["scale"])
+    if tier["fps"]:
+        timeline['fps'] = tier["fps"]
+    timeline['encoder_preset'] = tier["preset"]
+    timeline['pipe_format'] = job.pipe_format
+    timeline['puppet'] = job.puppet
+    print(f"   -> Resolusi {timeline['width']}x{timeline['height']} @ {timeline.get('fps')} fps (kualitas: {job.quality}).")
+    timeline["background"] = job.characters_data.get("background")
+    if not timeline["background"]:
+        print("   -> PERINGATAN: Tidak ada path latar belakang ditemukan di characters.json!")
+    else:
+        print(f"   -> Latar belakang diatur ke: {timeline['background']}")
+    timeline["characters"] = job.characters_data["characters"]
+    job.timeline = timeline
+
+def stage_audio(job):
+    """Menghasilkan audio dengan nada spesifik per karakter dan mengisi durasi tiap adegan."""
+    print("📢 Menghasilkan audio dengan nada spesifik per karakter...")
+    from scripts.tts_audio import generate_audio
+
+    job.timeline["audio"] = generate_audio(job.timeline, job.characters_map, job.output_dir,
+                                           concurrency=job.tts_concurrency, backend=job.tts_backend)
+    # Durasi adegan berubah, jadi jadwal frame harus dihitung ulang.
+    job._schedule = None
+
+def stage_validate(job):
+    from scripts.validate_timeline import validate_timeline
+
+    print("🔍 Memvalidasi timeline akhir...")
+    errors = validate_timeline(job.timeline)
+    if errors:
+        error_dump_path = os.path.join(job.workdir, "timeline_error_dump.json")
+        with open(error_dump_path, "w", encoding="utf-8") as f:
+            json.dump(job.timeline, f, indent=2, ensure_ascii=False)
+        raise ValueError(f"Timeline tidak valid. Lihat '{error_dump_path}'.\n" + "\n".join(errors))
+
+def stage_subtitles(job):
+    from scripts.subtitles_ass import build_ass
+
+    print("✍️ Membuat subtitle...")
+    build_ass(job.timeline, job.subtitles_path, schedule=job.schedule)
+
+def stage_render(job):
+    """
+    Merender frame video. Pada perakitan 'single' audio & subtitle langsung ikut
+    di-encode; jika gagal (atau memakai segmen), video tanpa audio dirender dan
+    dirakit oleh tahap mux.
+    """
+    from scripts.render_frames_pipe import DEFAULT_SEED, parse_segments, render_all
+
+    if job.incremental:
+        from scripts.incremental_render import render_incremental
+
+        print("🖼️ Merender adegan yang berubah...")
+        render_incremental(job.timeline, job.video_noaudio_path, job.schedule,
+                           job.timeline.get("seed", DEFAULT_SEED), job.workers)
+        job.subtitles_burned = True
+        return
+
+    segments = parse_segments(job.segments)
+    if job.assembly == "single" and segments:
+        print("   -> Mode segmen memakai perakitan dua tahap.")
+
+    if job.assembly == "single" and not segments:
+        print("🖼️ Merender frame video + audio + subtitle dalam satu encode...")
+        try:
+            render_all(
+                timeline=job.timeline, output_video=job.video_path, schedule=job.schedule,
+                workers=job.workers, audio_path=job.audio_path, subtitles_path=job.subtitles_path
+            )
+            job.muxed = True
+            return
+        except RuntimeError as e:
+            print(f"⚠️ Perakitan satu kali gagal ({e}). Beralih ke perakitan dua tahap...")
+
+    print("🖼️ Merender frame video...")
+    render_all(
+        timeline=job.timeline, output_video=job.video_noaudio_path, schedule=job.schedule,
+        workers=job.workers, segments=segments
+    )
+
+def stage_mux(job):
+    """
+    Merakit video akhir dari video tanpa audio. Jika subtitle belum di-burn,
+    video di-encode ulang (cara lama); jika sudah, audio cukup ditambahkan.
+    """
+    if job.muxed:
+        return
+    print("🎬 Menggabungkan semua file...")
+    trace.count("subprocess.spawned")
+    if job.subtitles_burned:
+        # Subtitle sudah ada di dalam segmen: cukup tambahkan audio tanpa encode ulang video.
+        subprocess.run([
+            "ffmpeg", "-y",
+            "-i", job.video_noaudio_path,
+            "-i", job.audio_path,
+            "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac",
+            job.video_path
+        ], check=True, capture_output=True)
+        job.muxed = True
+        return
+    from scripts.render_frames_pipe import encoder_args
+
+    subprocess.run([
+        "ffmpeg", "-y",
+        "-i", job.video_noaudio_path,
+        "-i", job.audio_path,
+        "-vf", f"ass={job.subtitles_path}",
+        # Sama dengan encode frame, termasuk preset tingkat kualitas (misalnya ultrafast untuk draft).
+        *encoder_args(job.timeline.get("encoder_preset")), "-c:a", "aac",
+        job.video_path
+    ], check=True, capture_output=True)
+    job.muxed = True
+
+STAGE_FUNCTIONS = {
+    "analyze": stage_analyze,
+    "audio": stage_audio,
+    "validate": stage_validate,
+    "subtitles": stage_subtitles,
+    "render": stage_render,
+    "mux": stage_mux,
+}
+
+def run_pipeline(script, characters, orientation=None, workdir=".", stages=STAGES, timeline=None, **options):
+    """
+    Menjalankan pipeline naskah -> video di dalam proses pemanggil.
+
+    `characters` adalah isi characters.json (dict). `stages` memilih tahap yang
+    dijalankan (urutan mengikuti STAGES), sehingga pemanggil bisa melewati tahap
+    yang hasilnya sudah ada, misalnya meneruskan `timeline` yang sudah berisi
+    durasi dan path audio. `options` diteruskan ke PipelineJob (workers,
+    segments, tts_concurrency, assembly, incremental, tts_backend, quality,
+    pipe_format, puppet).
+    Mengembalikan PipelineJob yang berisi timeline akhir dan path keluaran.
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Tahap tidak dikenal: {', '.join(sorted(unknown))}")
+    if not script:
+        raise ValueError("Naskah kosong")
+    if FFMPEG_STAGES & set(stages):
+        require_ffmpeg()
+
+    job = PipelineJob(script, characters, workdir, orientation, timeline, **options)
+    for stage in STAGES:
+        if stage in stages:
+            with trace.span(f"stage.{stage}", "stage"):
+                STAGE_FUNCTIONS[stage](job)
+    return job
 
 # =============================================================================
-# --- VALIDASI & RENDER --- 
+# --- CLI ---
 # =============================================================================
-from scripts.validate_timeline import validate_timeline
-from scripts.render_frames_pipe import render_all
-from scripts.subtitles_ass import build_ass
-
-print("🔍 Memvalidasi timeline akhir...")
-errors = validate_timeline(timeline)
-if errors:
-    with open("timeline_error_dump.json", "w", encoding="utf-8") as f:
-        json.dump(timeline, f, indent=2, ensure_ascii=False)
-    raise ValueError("Timeline tidak valid. Lihat 'timeline_error_dump.json'.\n" + "\n".join(errors))
-
-print("🖼️ Merender frame video...")
-render_all(timeline=timeline, output_video="output/video_noaudio.mp4")
-
-print("✍️ Membuat subtitle...")
-build_ass(timeline, "output/subtitles.ass")
-
-print("🎬 Menggabungkan semua file...")
-subprocess.run([
-    "ffmpeg", "-y",
-    "-i", "output/video_noaudio.mp4",
-    "-i", "output/audio.wav",
-    "-vf", "ass=output/subtitles.ass",
-    "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac",
-    "output/video.mp4"
-], check=True, capture_output=True)
-
-print("✅ RENDER SELESAI")
+def build_parser():
+    parser = argparse.ArgumentParser(description="Mengubah naskah (script.txt) menjadi video animasi.")
+    parser.add_argument("mode", nargs="?", default="render", choices=["render", "analyze"],
+                        help="'analyze' hanya menyimpan timeline, 'render' menjalankan seluruh pipeline")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Jumlah proses untuk merender frame secara paralel (1 = serial)")
+    parser.add_argument("--segments", default=None,
+                        help="Render & encode per segmen lalu sambung dengan concat: 'scene' atau jumlah frame per segmen")
+    parser.add_argument("--tts-concurrency", type=int, default=DEFAULT_TTS_CONCURRENCY,
+                        help="Jumlah permintaan TTS yang berjalan bersamaan")
+    parser.add_argument("--assembly", default="single", choices=["single", "two-step"],
+                        help="'single': frame, audio & subtitle dirakit dalam satu encode; "
+                             "'two-step': render video tanpa audio lalu encode ulang (cara lama)")
+    parser.add_argument("--quality", default=DEFAULT_QUALITY, choices=sorted(QUALITY_TIERS),
+                        help="'draft': pratinjau cepat (setengah resolusi, 12 fps, preset ultrafast); "
+                             "'final': resolusi & fps sesuai timeline")
+    parser.add_argument("--pipe-format", default=DEFAULT_PIPE_FORMAT, choices=PIPE_FORMATS,
+                        help="Format frame yang dikirim ke ffmpeg: 'rgba' (4 byte/piksel) atau "
+                             "'yuv420p' (1,5 byte/piksel, dikonversi di Python)")
+    parser.add_argument("--puppet", action="store_true",
+                        help="Animasikan kepala/lengan/kaki dengan transform raster pada lapisan yang "
+                             "dirasterisasi sekali, bukan rasterisasi SVG per sudut")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Pakai ulang segmen video adegan yang tidak berubah dari render sebelumnya")
+    parser.add_argument("--trace", nargs="?", const="", default=None, metavar="PATH",
+                        help="Catat span & counter per tahap lalu simpan sebagai Chrome trace JSON "
+                             "(default <workdir>/output/trace.json) dan cetak ringkasannya")
+    parser.add_argument("--workdir", default=".",
+                        help="Direktori kerja berisi script.txt & timeline.json; hasil ditulis ke <workdir>/output")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # --- Memuat File Sumber ---
+    script_path = os.path.join(args.workdir, "script.txt")
+    if not os.path.exists(script_path):
+        raise FileNotFoundError(f"File {script_path} tidak ditemukan.")
+    with open(script_path, encoding="utf-8") as f:
+        text = f.read().strip()
+
+    if not os.path.exists("characters.json"):
+        raise FileNotFoundError("File characters.json tidak ditemukan.")
+    with open("characters.json", encoding="utf-8") as f:
+        characters_data = json.load(f)
+
+    # --- Mode Analisis (Hanya Bot) ---
+    if args.mode == "analyze":
+        job = run_pipeline(text, characters_data, workdir=args.workdir, stages=("analyze",))
+        job.save_timeline()
+        print("Analisis selesai. Timeline disimpan.")
+        return
+
+    # --- Muat Timeline (jika sudah diedit lewat bot) ---
+    timeline = None
+    timeline_path = os.path.join(args.workdir, "timeline.json")
+    if os.path.exists(timeline_path):
+        with open(timeline_path, encoding="utf-8") as f:
+            timeline = json.load(f)
+
+    if args.trace is not None:
+        trace.enable()
+    try:
+        with trace.span("pipeline", "stage"):
+            run_pipeline(
+                text, characters_data, workdir=args.workdir, timeline=timeline,
+                workers=args.workers, segments=args.segments,
+                tts_concurrency=args.tts_concurrency, assembly=args.assembly,
+                incremental=args.incremental, quality=args.quality,
+                pipe_format=args.pipe_format, puppet=args.puppet
+            )
+        print("✅ RENDER SELESAI")
+    finally:
+        if args.trace is not None:
+            trace_path = args.trace or os.path.join(args.workdir, "output", "trace.json")
+            trace.export_chrome_trace(trace_path)
+            print(trace.summary_table())
+            print(f"📊 Trace disimpan di {trace_path}")
+            trace.disable()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import numpy as np
+
+# Kurva animasi prosedural (anggukan kepala, langkah berjalan, ayunan kaki &
+# tangan, pose gestur) yang dievaluasi sekaligus untuk satu adegan sebagai array
+# NumPy atas indeks frame. Nilainya dikuantisasi sehingga frame dengan nilai sama
+# menghasilkan status & sprite yang sama (lihat FrameRenderer.frame_state).
+
+# Anggukan kepala per emosi: (amplitudo derajat, kecepatan rad/detik).
+HEAD_NOD_CURVES = {
+    "thinking": (6, 1.5),
+    "happy": (4, 2.5),
+    "angry": (1.5, 8),
+}
+# Kecepatan siklus berjalan (rad/detik) dan amplitudo tiap bagian tubuh.
+WALK_SPEED = 5
+WALK_BOB = 4
+WALK_LEG_SWING = 20
+WALK_ARM_SWING = 15
+
+
+def _head_nod(t, emotion, gesture):
+    amplitude, speed = HEAD_NOD_CURVES.get(emotion, (0, 0))
+    return np.sin(t * speed) * amplitude
+
+
+def _walk(amplitude):
+    def curve(t, emotion, gesture):
+        if gesture != "walk":
+            return np.zeros_like(t)
+        return np.sin(t * WALK_SPEED) * amplitude
+    return curve
+
+
+def _pose(values):
+    """Kurva konstan per gestur, misalnya sudut lengan saat mengangkat tangan."""
+    def curve(t, emotion, gesture):
+        return np.full_like(t, values.get(gesture, 0))
+    return curve
+
+
+# Kanal animasi: (nama, kurva(t, emosi, gestur), langkah kuantisasi, keluaran).
+# Setiap keluaran berupa (id alternatif, format atribut transform, arah); id
+# pertama yang ada di SVG dipakai, dan arah -1 mencerminkan gerakan kiri/kanan.
+# Kanal tanpa target di SVG dilewati, dan nilai 0 tidak mengubah transform
+# bawaan aset.
+CHANNELS = [
+    ("head_nod", _head_nod, 0.5, [(("head_group",), "rotate({v} 256 180)", 1)]),
+    ("walk_bob", _walk(WALK_BOB), 0.5, [(("body_group", "ghost-character"), "translate(0 {v})", 1)]),
+    ("leg_swing", _walk(WALK_LEG_SWING), 1.0, [
+        (("leg_left",), "rotate({v} 256 370)", 1),
+        (("leg_right",), "rotate({v} 256 370)", -1),
+    ]),
+    ("arm_swing", _walk(WALK_ARM_SWING), 1.0, [
+        (("hand_left",), "rotate({v} 256 250)", -1),
+        (("hand_right",), "rotate({v} 256 250)", 1),
+    ]),
+    ("hand_raise", _pose({"raise_hand": -25}), 1.0, [(("hand_right",), "rotate({v} 256 250)", 1)]),
+    ("arm_right_pose", _pose({"raise_hand": -60, "point": -20}), 1.0, [(("arm_right",), "rotate({v} 327 270)", 1)]),
+    ("arm_left_pose", _pose({"thinking": 20}), 1.0, [(("arm_left",), "rotate({v} 185 270)", 1)]),
+]
+
+
+def _format_value(value):
+    return f"{value:g}"
+
+
+class AnimationRig:
+    """
+    Rig animasi satu SvgTemplate: hanya kanal yang elemen targetnya ada di SVG.
+
+    `scene_params` mengevaluasi semua kanal untuk seluruh frame sebuah adegan
+    sekaligus dan mengembalikan tabel parameter; `apply` mengubah satu baris
+    tabel menjadi override atribut untuk SvgTemplate.render().
+    """
+
+    def __init__(self, template, step_scale=1.0):
+        # `step_scale` < 1 memperhalus kuantisasi (misalnya untuk mode puppet,
+        # di mana setiap nilai baru hanya butuh resampling raster, bukan rasterisasi SVG).
+        self.channels = []
+        for name, curve, step, outputs in CHANNELS:
+            step *= step_scale
+            targets = []
+            for element_ids, fmt, direction in outputs:
+                element_id = next((i for i in element_ids if template.has(i)), None)
+                if element_id is not None:
+                    targets.append((element_id, fmt, direction))
+            if targets:
+                self.channels.append((name, curve, step, targets))
+
+    def __bool__(self):
+        return bool(self.channels)
+
+    def scene_params(self, frame_count, fps, emotion=None, gesture=None):
+        """
+        Tabel parameter untuk `frame_count` frame sebuah adegan: (baris, indeks).
+        `baris` adalah list tuple nilai kanal terkuantisasi (dalam satuan langkah)
+        yang unik, dan `indeks[i]` menunjuk baris untuk frame lokal ke-i. Tanpa
+        kanal, setiap frame memakai tuple kosong.
+        """
+        if not self.channels or frame_count <= 0:
+            return [()], np.zeros(max(frame_count, 0), dtype=np.intp)
+        t = np.arange(frame_count, dtype=np.float64) / fps
+        table = np.empty((frame_count, len(self.channels)), dtype=np.int32)
+        for column, (_, curve, step, _) in enumerate(self.channels):
+            table[:, column] = np.rint(curve(t, emotion, gesture) / step)
+        rows, index = np.unique(table, axis=0, return_inverse=True)
+        return [tuple(int(v) for v in row) for row in rows], index.reshape(-1)
+
+    def apply(self, params, overrides):
+        """Mengisi `overrides` dari satu baris tabel parameter."""
+        for (_, _, step, targets), quantized in zip(self.channels, params):
+            if quantized == 0:
+                continue
+            value = quantized * step
+            for element_id, fmt, direction in targets:
+                overrides[(element_id, "transform")] = fmt.format(v=_format_value(value * direction))
@@ -0,0 +1,115 @@
+import subprocess
+import wave
+
+import numpy as np
+
+from scripts import trace
+
+# Parameter STFT untuk time-stretch phase vocoder (jendela ~43 ms pada 24kHz).
+STFT_SIZE = 1024
+STFT_HOP = STFT_SIZE // 4
+_WINDOW = np.hanning(STFT_SIZE + 1)[:-1]  # Hann periodik
+
+
+def decode_audio(data: bytes, sample_rate: int) -> np.ndarray:
+    """
+    Mendekode audio terkompresi (misalnya MP3 dari TTS) menjadi PCM int16 mono.
+    Satu proses ffmpeg, seluruhnya lewat pipe tanpa file sementara.
+    """
+    trace.count("subprocess.spawned")
+    with trace.span("audio.decode", "audio"):
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+            input=data, check=True, capture_output=True
+        )
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def _stft(samples):
+    padded = np.pad(samples, STFT_SIZE // 2)
+    frame_count = max(1, 1 + (len(padded) - STFT_SIZE) // STFT_HOP)
+    starts = np.arange(frame_count) * STFT_HOP
+    frames = padded[starts[:, None] + np.arange(STFT_SIZE)] * _WINDOW
+    return np.fft.rfft(frames, axis=1)
+
+
+def _istft(spectrum, length):
+    frames = np.fft.irfft(spectrum, n=STFT_SIZE, axis=1) * _WINDOW
+    frame_count = len(frames)
+    out_length = (frame_count - 1) * STFT_HOP + STFT_SIZE
+    out = np.zeros(out_length)
+    norm = np.zeros(out_length)
+    # Overlap-add per potongan hop: loop hanya STFT_SIZE // STFT_HOP kali, bukan per frame.
+    for k in range(STFT_SIZE // STFT_HOP):
+        chunk = slice(k * STFT_HOP, (k + 1) * STFT_HOP)
+        region = slice(k * STFT_HOP, k * STFT_HOP + frame_count * STFT_HOP)
+        out[region] += frames[:, chunk].reshape(-1)
+        norm[region] += np.tile(_WINDOW[chunk] ** 2, frame_count)
+    out /= np.maximum(norm, 1e-8)
+    out = out[STFT_SIZE // 2:]
+    if len(out) < length:
+        out = np.pad(out, (0, length - len(out)))
+    return out[:length]
+
+
+def time_stretch(samples: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Mengubah durasi sinyal menjadi `factor` kali tanpa mengubah nada.
+
+    Memakai phase vocoder: magnitudo STFT diinterpolasi pada posisi waktu baru,
+    dan fase diakumulasikan dengan `cumsum` sehingga seluruh perhitungan berjalan
+    secara vektor tanpa loop per frame.
+    """
+    target_length = int(round(len(samples) * factor))
+    if len(samples) == 0 or target_length == 0:
+        return np.zeros(target_length)
+
+    spectrum = _stft(np.asarray(samples, dtype=np.float64))
+    bins = spectrum.shape[1]
+    time_steps = np.arange(0, len(spectrum), 1.0 / factor)
+    spectrum = np.vstack([spectrum, np.zeros((1, bins))])
+
+    index = time_steps.astype(np.int64)
+    alpha = (time_steps - index)[:, None]
+    current, following = spectrum[index], spectrum[index + 1]
+    magnitude = (1 - alpha) * np.abs(current) + alpha * np.abs(following)
+
+    expected_advance = np.linspace(0, np.pi * STFT_HOP, bins)
+    delta = np.angle(following) - np.angle(current) - expected_advance
+    delta -= 2 * np.pi * np.round(delta / (2 * np.pi))
+    advance = expected_advance + delta
+    phase = np.angle(spectrum[0]) + np.vstack([np.zeros((1, bins)), np.cumsum(advance[:-1], axis=0)])
+
+    return _istft(magnitude * np.exp(1j * phase), target_length)
+
+
+def pitch_shift(pcm: np.ndarray, pitch: float) -> np.ndarray:
+    """
+    Menggeser nada sebesar `pitch` kali dengan durasi tetap (setara
+    `asetrate=SR*pitch,atempo=1/pitch` di ffmpeg): sinyal diregangkan `pitch`
+    kali lalu di-resample kembali ke panjang semula.
+    """
+    if pitch == 1.0 or len(pcm) == 0:
+        return pcm.astype(np.int16, copy=False)
+    with trace.span("audio.pitch_shift", "audio"):
+        stretched = time_stretch(pcm.astype(np.float64), pitch)
+        positions = np.arange(len(pcm), dtype=np.float64) * (len(stretched) / len(pcm))
+        shifted = np.interp(positions, np.arange(len(stretched)), stretched)
+        return np.clip(np.round(shifted), -32768, 32767).astype(np.int16)
+
+
+def read_wav(path: str):
+    """Membaca WAV PCM 16-bit mono. Mengembalikan (array int16, sample_rate)."""
+    with wave.open(path, "rb") as wf:
+        rate = wf.getframerate()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return pcm, rate
+
+
+def write_wav(path: str, pcm: np.ndarray, sample_rate: int):
+    """Menulis PCM int16 mono ke file WAV dalam satu kali tulis."""
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
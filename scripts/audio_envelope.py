@@ -1,26 +1,57 @@
-import wave
 import numpy as np
 
-def load_audio_envelope(wav_path, fps):
-    with wave.open(wav_path, "rb") as wf:
-        sr = wf.getframerate()
-        frames = wf.readframes(wf.getnframes())
-        audio = np.frombuffer(frames, dtype=np.int16)
+from scripts.audio_engine import read_wav
 
-    max_val = np.max(np.abs(audio))
-    if max_val > 0:
-        audio = audio / max_val
+# Jumlah tingkat bukaan mulut (0 = tertutup). Sedikit tingkat berarti sedikit
+# variasi sprite mulut yang perlu dirasterisasi dan disimpan di cache.
+MOUTH_LEVELS = 4
+# Envelope di bawah ambang ini (relatif terhadap puncaknya) dianggap diam.
+SILENCE_THRESHOLD = 0.08
+
+def envelope_from_pcm(pcm, sample_rate, fps, total_frames=None):
+    """
+    Rata-rata amplitudo absolut PCM per frame video, dinormalisasi ke 0..1.
+
+    Dihitung sekaligus untuk seluruh array: PCM diberi padding hingga tepat
+    `total_frames` frame lalu di-reshape menjadi (frame, sampel_per_frame).
+    """
+    audio = np.abs(np.asarray(pcm, dtype=np.float32))
+    if total_frames is None:
+        total_frames = int(np.ceil(len(audio) * fps / sample_rate))
+    if total_frames <= 0:
+        return np.zeros(0, dtype=np.float32)
+
+    if sample_rate % fps == 0:
+        samples_per_frame = sample_rate // fps
+        needed = total_frames * samples_per_frame
+        audio = np.pad(audio[:needed], (0, max(0, needed - len(audio))))
+        envelope = audio.reshape(total_frames, samples_per_frame).mean(axis=1)
     else:
-        audio = audio.astype(np.float32)
+        # Batas frame tidak jatuh tepat pada sampel: jumlahkan per rentang dengan reduceat.
+        bounds = np.round(np.arange(total_frames + 1) * sample_rate / fps).astype(np.int64)
+        audio = np.pad(audio[:bounds[-1]], (0, max(0, bounds[-1] - len(audio))))
+        envelope = np.add.reduceat(audio, bounds[:-1]) / np.diff(bounds)
+
+    peak = envelope.max()
+    return envelope / peak if peak > 0 else envelope
 
-    samples_per_frame = int(sr / fps)
+def quantize_envelope(envelope, levels=MOUTH_LEVELS, threshold=SILENCE_THRESHOLD):
+    """Mengubah envelope 0..1 menjadi tingkat bukaan mulut bulat 0..levels-1."""
+    envelope = np.asarray(envelope, dtype=np.float32)
+    quantized = np.ceil(envelope * (levels - 1)).astype(np.uint8)
+    quantized[envelope < threshold] = 0
+    return quantized
 
-    envelope = []
-    for i in range(0, len(audio), samples_per_frame):
-        chunk = audio[i:i + samples_per_frame]
-        if len(chunk) == 0:
-            envelope.append(0.0)
-        else:
-            envelope.append(float(np.mean(np.abs(chunk))))
+def load_scene_mouth_levels(wav_path, fps, durations, frame_counts, levels=MOUTH_LEVELS):
+    """
+    Tingkat bukaan mulut per adegan dari file WAV: list array, satu per adegan,
+    masing-masing sepanjang `frame_counts[i]` frame dengan indeks frame lokal.
 
-    return envelope
+    Envelope setiap adegan dihitung dari sampel audionya sendiri (mulai dari
+    awal adegan menurut `durations`) dan dinormalisasi ke puncak adegan itu,
+    sehingga mengubah durasi atau volume adegan lain tidak mengubah hasilnya.
+    """
+    audio, sr = read_wav(wav_path)
+    bounds = np.round(np.concatenate(([0.0], np.cumsum(durations))) * sr).astype(np.int64)
+    return [quantize_envelope(envelope_from_pcm(audio[start:end], sr, fps, int(frame_count)), levels)
+            for start, end, frame_count in zip(bounds[:-1], bounds[1:], frame_counts)]
@@ -1,10 +1,30 @@
 import hashlib
 import json
 import os
+import shutil
+import tempfile
+import wave
 
 CACHE_DIR = "cache/timelines"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Cache audio TTS yang sudah diproses (WAV), dibagi oleh semua proses render.
+AUDIO_CACHE_DIR = "cache/audio"
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get("AUDIO_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Hash isi file aset per (path, mtime), agar file yang sama tidak dibaca ulang.
+_file_digests = {}
+
+def file_digest(path: str):
+    """SHA-256 isi file, atau None jika file tidak ada."""
+    if not path or not os.path.exists(path):
+        return None
+    key = (path, os.path.getmtime(path))
+    if key not in _file_digests:
+        with open(path, "rb") as f:
+            _file_digests[key] = hashlib.sha256(f.read()).hexdigest()
+    return _file_digests[key]
+
 def script_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
@@ -21,3 +41,104 @@ def save_cached_timeline(text: str, timeline: dict):
     path = os.path.join(CACHE_DIR, f"{h}.json")
     with open(path, "w", encoding="utf-8") as f:
         json.dump(timeline, f, indent=2, ensure_ascii=False)
+
+# =====================
+# AUDIO TTS
+# =====================
+def audio_key(text: str, lang: str, backend: str, pitch: float) -> str:
+    """Kunci cache audio: hash dari teks, bahasa, backend TTS, dan nada karakter."""
+    payload = json.dumps([text, lang, backend, float(pitch)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def wav_duration(path: str) -> float:
+    """Durasi tepat file WAV dari jumlah sampelnya."""
+    with wave.open(path, "rb") as wf:
+        rate = wf.getframerate()
+        return wf.getnframes() / float(rate) if rate else 0.0
+
+def load_cached_audio(key: str, dest_path: str):
+    """
+    Menyalin audio dari cache ke `dest_path` dan mengembalikan durasinya, atau
+    None jika tidak ada. Salinan dipakai agar entri boleh dibuang proses lain
+    kapan saja tanpa merusak render yang sedang berjalan.
+    """
+    path = os.path.join(AUDIO_CACHE_DIR, f"{key}.wav")
+    try:
+        shutil.copyfile(path, dest_path)
+        # Tandai sebagai baru dipakai untuk eviction LRU.
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return wav_duration(dest_path)
+
+def store_cached_audio(key: str, wav_path: str):
+    """Menyimpan salinan `wav_path` ke cache secara atomik, lalu menjaga batas ukuran cache."""
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=AUDIO_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(wav_path, temp_path)
+        # os.replace atomik: proses lain hanya melihat file lama atau file yang utuh.
+        os.replace(temp_path, os.path.join(AUDIO_CACHE_DIR, f"{key}.wav"))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    evict_lru(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, suffix=".wav")
+
+def load_cached_pcm(key: str, sample_rate: int):
+    """
+    Membaca PCM int16 mono (bytes) dari cache, atau None jika tidak ada atau
+    formatnya tidak sesuai `sample_rate`.
+    """
+    path = os.path.join(AUDIO_CACHE_DIR, f"{key}.wav")
+    try:
+        with wave.open(path, "rb") as wf:
+            if wf.getframerate() != sample_rate or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                return None
+            frames = wf.readframes(wf.getnframes())
+        os.utime(path)
+    except (FileNotFoundError, wave.Error, EOFError):
+        return None
+    return frames
+
+def store_cached_pcm(key: str, pcm_bytes: bytes, sample_rate: int):
+    """Menyimpan PCM int16 mono ke cache sebagai WAV secara atomik, lalu menjaga batas ukuran cache."""
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=AUDIO_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm_bytes)
+        os.replace(temp_path, os.path.join(AUDIO_CACHE_DIR, f"{key}.wav"))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    evict_lru(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, suffix=".wav")
+
+def evict_lru(directory: str, max_bytes: int, suffix: str = ""):
+    """Menghapus file yang paling lama tidak dipakai hingga total ukuran <= `max_bytes`."""
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.endswith(suffix):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Sudah dibuang oleh proses lain.
+            pass
+        total -= size
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Jumlah pasangan kunci sprite yang kotak selisihnya (diff bbox) disimpan. Hanya
+# kotaknya yang disimpan, bukan sprite-nya, jadi memori sprite tetap dibatasi SpriteCache.
+DIFF_CACHE_SIZE = 4096
+# Format piksel yang bisa dikirim ke ffmpeg lewat pipe rawvideo.
+PIXEL_FORMATS = ("rgba", "yuv420p")
+
+
+def premultiply(rgba):
+    """Mengubah array RGBA biasa (uint8, HxWx4) menjadi RGBA premultiplied-alpha."""
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    out = np.empty_like(rgba)
+    color = rgba[..., :3] * alpha
+    out[..., :3] = (color + 127) // 255
+    out[..., 3:4] = rgba[..., 3:4]
+    return out
+
+
+def frame_nbytes(width, height, pixel_format="rgba"):
+    """Ukuran satu frame (byte) dalam format piksel pipe."""
+    if pixel_format == "yuv420p":
+        return width * height * 3 // 2
+    return width * height * 4
+
+
+def rgba_to_yuv420p(rgb, y_plane, u_plane, v_plane):
+    """
+    Mengubah piksel RGB (HxWx3 atau lebih, H & W genap) menjadi YUV 4:2:0 planar
+    BT.601 rentang terbatas (Y 16..235, UV 16..240), sama dengan konversi bawaan
+    ffmpeg dari rgba ke yuv420p. Kroma dihitung dari rata-rata blok 2x2.
+    """
+    rgb = rgb[..., :3].astype(np.int32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    np.copyto(y_plane, ((66 * r + 129 * g + 25 * b + 128) >> 8) + 16, casting="unsafe")
+
+    h, w = rgb.shape[:2]
+    # Jumlah 4 piksel per blok; faktor 4 ikut dibagi pada pergeseran (>> 10).
+    block = rgb.reshape(h // 2, 2, w // 2, 2, 3).sum(axis=(1, 3))
+    r, g, b = block[..., 0], block[..., 1], block[..., 2]
+    np.copyto(u_plane, ((-38 * r - 74 * g + 112 * b + 512) >> 10) + 128, casting="unsafe")
+    np.copyto(v_plane, ((112 * r - 94 * g - 18 * b + 512) >> 10) + 128, casting="unsafe")
+
+
+class FrameCompositor:
+    """
+    Menyusun frame video di atas buffer RGBA NumPy yang dialokasikan sekali.
+
+    Sprite diharapkan sudah dalam bentuk premultiplied-alpha (lihat `premultiply`)
+    sehingga pencampuran cukup `dst = src + dst * (255 - a) / 255`, dihitung
+    secara vektor dengan buffer kerja yang juga dipakai ulang setiap frame.
+
+    `compose(layers)` mengingat lapisan frame terakhir, lalu hanya
+    menggambar ulang persegi panjang yang berubah (dirty rect): latar belakang
+    dipulihkan di area itu dan lapisan yang beririsan dicampur ulang.
+
+    Dengan `pixel_format="yuv420p"`, frame yang dikirim ke pipe adalah YUV 4:2:0
+    planar (1,5 byte/piksel, bukan 4). Frame tetap disusun dalam RGBA; hanya
+    area yang digambar ulang oleh `compose` yang dikonversi ke bidang Y/U/V.
+    """
+
+    def __init__(self, width, height, background=None, pixel_format="rgba"):
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Format piksel tidak didukung: {pixel_format}")
+        if pixel_format == "yuv420p" and (width % 2 or height % 2):
+            raise ValueError(f"yuv420p membutuhkan resolusi genap, bukan {width}x{height}.")
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.frame = np.zeros((height, width, 4), dtype=np.uint8)
+        self.background = np.zeros((height, width, 4), dtype=np.uint8)
+        self.background[..., 3] = 255
+        if background is not None:
+            self.set_background(background)
+        # Buffer yang dikirim ke pipe: frame RGBA itu sendiri, atau bidang Y, U, V berurutan.
+        self.output = self.frame.reshape(-1)
+        if pixel_format == "yuv420p":
+            self.output = np.zeros(frame_nbytes(width, height, pixel_format), dtype=np.uint8)
+            luma, chroma = width * height, (width // 2) * (height // 2)
+            self.y_plane = self.output[:luma].reshape(height, width)
+            self.u_plane = self.output[luma:luma + chroma].reshape(height // 2, width // 2)
+            self.v_plane = self.output[luma + chroma:].reshape(height // 2, width // 2)
+        # memoryview 1 dimensi atas buffer keluaran, dipakai untuk menulis ke pipe tanpa salinan.
+        self._frame_bytes = memoryview(self.output).cast("B")
+        self._scratch = np.empty((0, 0, 4), dtype=np.uint16)
+        self._scratch_shift = np.empty((0, 0, 4), dtype=np.uint16)
+        self._scratch_alpha = np.empty((0, 0, 1), dtype=np.uint16)
+        # Lapisan frame terakhir [(sprite, x, y, kunci)]; None berarti isi frame tidak diketahui.
+        self._layers = None
+        self._diff_boxes = OrderedDict()
+
+    def set_background(self, background):
+        """Menetapkan latar belakang (premultiplied RGBA, ukuran sama dengan frame)."""
+        if background.shape != self.background.shape:
+            raise ValueError(f"Ukuran latar belakang {background.shape} tidak cocok dengan frame {self.background.shape}.")
+        np.copyto(self.background, background)
+        self._layers = None
+
+    def begin_frame(self):
+        """Memulai frame baru dengan menyalin latar belakang ke buffer frame."""
+        np.copyto(self.frame, self.background)
+        self._layers = None
+
+    def compose(self, layers):
+        """
+        Menyusun frame dari `layers` (list (sprite, x, y, kunci), dari bawah ke atas).
+        `kunci` adalah nilai hashable yang menandai isi sprite (misalnya kunci pose
+        di SpriteCache), dipakai untuk meng-cache kotak selisih antar-sprite; None
+        berarti kotak selisihnya dihitung tanpa cache.
+
+        Dibandingkan dengan frame sebelumnya, hanya area yang berubah yang
+        digambar ulang. Mengembalikan list persegi panjang (x0, y0, x1, y1) yang
+        digambar ulang; list kosong berarti frame sama persis dengan sebelumnya.
+        """
+        previous = self._layers
+        if previous is None or len(previous) != len(layers):
+            self.begin_frame()
+            for sprite, x, y, _ in layers:
+                self.blend(sprite, x, y)
+            self._layers = list(layers)
+            rects = [(0, 0, self.width, self.height)]
+            self._update_output(rects)
+            return rects
+
+        dirty = []
+        for (old, old_x, old_y, old_key), (new, x, y, key) in zip(previous, layers):
+            if (old is new or (key is not None and old_key == key)) and (old_x, old_y) == (x, y):
+                continue
+            if (old_x, old_y) == (x, y) and old.shape == new.shape:
+                # Sprite berganti di tempat yang sama (misalnya hanya mulut): cukup area selisihnya.
+                box = self._diff_box(old, new, old_key, key)
+                if box is not None:
+                    dirty.append((x + box[0], y + box[1], x + box[2], y + box[3]))
+            else:
+                dirty.append((old_x, old_y, old_x + old.shape[1], old_y + old.shape[0]))
+                dirty.append((x, y, x + new.shape[1], y + new.shape[0]))
+
+        rects = []
+        for x0, y0, x1, y1 in dirty:
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, self.width), min(y1, self.height)
+            if x0 < x1 and y0 < y1:
+                rects.append((x0, y0, x1, y1))
+        for rect in rects:
+            x0, y0, x1, y1 = rect
+            np.copyto(self.frame[y0:y1, x0:x1], self.background[y0:y1, x0:x1])
+            for sprite, x, y, _ in layers:
+                self.blend(sprite, x, y, clip=rect)
+        self._layers = list(layers)
+        self._update_output(rects)
+        return rects
+
+    def _update_output(self, rects):
+        """Mengonversi area yang digambar ulang ke bidang YUV (diperlebar ke koordinat genap)."""
+        if self.pixel_format != "yuv420p":
+            return
+        for x0, y0, x1, y1 in rects:
+            x0, y0 = x0 & ~1, y0 & ~1
+            x1, y1 = min(x1 + (x1 & 1), self.width), min(y1 + (y1 & 1), self.height)
+            rgba_to_yuv420p(
+                self.frame[y0:y1, x0:x1],
+                self.y_plane[y0:y1, x0:x1],
+                self.u_plane[y0 // 2:y1 // 2, x0 // 2:x1 // 2],
+                self.v_plane[y0 // 2:y1 // 2, x0 // 2:x1 // 2],
+            )
+
+    def _diff_box(self, old, new, old_key=None, new_key=None):
+        """
+        Kotak (x0, y0, x1, y1) piksel yang berbeda antara dua sprite seukuran,
+        di-cache per pasangan kunci sprite jika keduanya diberikan.
+        """
+        key = None
+        if old_key is not None and new_key is not None:
+            key = (old_key, new_key)
+            if key in self._diff_boxes:
+                self._diff_boxes.move_to_end(key)
+                return self._diff_boxes[key]
+        changed = np.any(old != new, axis=2)
+        rows = np.flatnonzero(changed.any(axis=1))
+        box = None
+        if rows.size:
+            cols = np.flatnonzero(changed.any(axis=0))
+            box = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+        if key is not None:
+            self._diff_boxes[key] = box
+            if len(self._diff_boxes) > DIFF_CACHE_SIZE:
+                self._diff_boxes.popitem(last=False)
+        return box
+
+    def blend(self, sprite, x, y, clip=None):
+        """
+        Mencampur sprite premultiplied ke buffer frame pada posisi kiri-atas (x, y),
+        dibatasi pada persegi panjang `clip` (x0, y0, x1, y1) jika diberikan.
+        """
+        sprite_h, sprite_w = sprite.shape[:2]
+        clip_x0, clip_y0, clip_x1, clip_y1 = clip or (0, 0, self.width, self.height)
+        x0, y0 = max(x, clip_x0), max(y, clip_y0)
+        x1, y1 = min(x + sprite_w, clip_x1), min(y + sprite_h, clip_y1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        h, w = y1 - y0, x1 - x0
+        src = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+        dst = self.frame[y0:y1, x0:x1]
+
+        self._ensure_scratch(h, w)
+        tmp = self._scratch[:h, :w]
+        shift = self._scratch_shift[:h, :w]
+        inv_alpha = self._scratch_alpha[:h, :w]
+
+        np.subtract(255, src[..., 3:4], out=inv_alpha)
+        np.multiply(dst, inv_alpha, out=tmp)
+        # Pembagian dengan 255 yang dibulatkan: (x + 128 + ((x + 128) >> 8)) >> 8
+        tmp += 128
+        np.right_shift(tmp, 8, out=shift)
+        tmp += shift
+        np.right_shift(tmp, 8, out=tmp)
+        tmp += src
+        np.copyto(dst, tmp, casting="unsafe")
+
+    @property
+    def frame_nbytes(self):
+        return self.output.nbytes
+
+    def write_to(self, stream):
+        """Menulis isi frame ke stream (misalnya stdin ffmpeg) tanpa membuat salinan bytes."""
+        stream.write(self._frame_bytes)
+
+    def _ensure_scratch(self, h, w):
+        if self._scratch.shape[0] >= h and self._scratch.shape[1] >= w:
+            return
+        h = max(h, self._scratch.shape[0])
+        w = max(w, self._scratch.shape[1])
+        self._scratch = np.empty((h, w, 4), dtype=np.uint16)
+        self._scratch_shift = np.empty((h, w, 4), dtype=np.uint16)
+        self._scratch_alpha = np.empty((h, w, 1), dtype=np.uint16)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from scripts import trace
+from scripts.cache import evict_lru, file_digest
+from scripts.render_frames_pipe import ENCODER_ARGS, FrameRenderer
+from scripts.segment_render import concat_segments, render_segment_tasks
+from scripts.subtitles_ass import scene_ass
+
+# Segmen video per adegan yang sudah di-encode, dibagi oleh semua job render.
+SEGMENT_CACHE_DIR = "cache/segments"
+SEGMENT_CACHE_MAX_BYTES = int(os.environ.get("SEGMENT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+# Naikkan jika cara merender berubah sehingga segmen lama tidak lagi valid.
+SEGMENT_FORMAT_VERSION = 1
+
+def scene_hash(renderer, scene_index, start, end, subtitles=None):
+    """
+    Hash isi sebuah adegan: teks, pembicara, emosi, nada, isi aset SVG & latar
+    belakang, posisi para karakter, resolusi, fps, parameter encoder, subtitle,
+    dan status visual setiap frame-nya (mulut, kedipan, gestur). Dua adegan
+    dengan hash sama menghasilkan segmen video yang identik.
+    """
+    scene = renderer.schedule.scenes[scene_index]
+    speaker = scene.get("speaker")
+    pitch = renderer.char_data_map.get(speaker, {}).get("pitch", 1.0)
+    runs = [[frame_count, state] for _, frame_count, state in renderer.plan_runs(start, end)]
+    svg_paths = sorted(set(renderer.scene_svgs(scene_index).values()))
+    payload = [
+        SEGMENT_FORMAT_VERSION,
+        scene.get("text"), speaker, scene.get("emotion"), pitch,
+        runs,
+        {path: file_digest(path) for path in svg_paths},
+        file_digest(renderer.background_path),
+        sorted(renderer.character_positions.items()),
+        [renderer.width, renderer.height, renderer.schedule.fps, renderer.char_render_w, renderer.char_render_h],
+        ENCODER_ARGS, renderer.encoder_preset, renderer.pixel_format, renderer.puppet,
+        subtitles,
+    ]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src, dst):
+    """Hard link jika bisa (tanpa salinan), selain itu salin file."""
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def fetch_segment(key, dest_path):
+    """
+    Mengambil segmen dari cache ke `dest_path`. Mengembalikan False jika tidak ada.
+    Segmen di-link ke direktori job, sehingga tetap utuh walau entri cache
+    dibuang proses lain sebelum penyambungan.
+    """
+    cached_path = os.path.join(SEGMENT_CACHE_DIR, f"{key}.mp4")
+    try:
+        _link_or_copy(cached_path, dest_path)
+        os.utime(cached_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def store_segment(key, segment_path):
+    """Menyimpan segmen ke cache secara atomik."""
+    fd, temp_path = tempfile.mkstemp(dir=SEGMENT_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        os.remove(temp_path)
+        _link_or_copy(segment_path, temp_path)
+        os.replace(temp_path, os.path.join(SEGMENT_CACHE_DIR, f"{key}.mp4"))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def render_incremental(timeline, output_video, schedule, seed, workers=1, subtitles=True):
+    """
+    Merender video per adegan dan hanya meng-encode adegan yang isinya berubah.
+
+    Setiap adegan menjadi satu segmen .mp4 yang disimpan di SEGMENT_CACHE_DIR
+    dengan nama hash isinya (lihat scene_hash). Adegan yang hash-nya sudah ada
+    langsung dipakai ulang; sisanya dirender paralel, disimpan, lalu semua
+    segmen disambung tanpa encode ulang. Dengan `subtitles`, subtitle tiap
+    adegan sudah di-burn ke segmennya sehingga video akhir cukup di-mux dengan
+    audio (-c:v copy).
+    """
+    renderer = FrameRenderer(timeline, schedule, seed)
+    os.makedirs(SEGMENT_CACHE_DIR, exist_ok=True)
+    job_dir = os.path.join(os.path.dirname(output_video) or ".", "segments")
+    os.makedirs(job_dir, exist_ok=True)
+
+    segment_paths = []
+    tasks = []
+    new_segments = []
+    for i, scene, start, end in schedule.iter_scenes():
+        ass_text = scene_ass(timeline, scene, (end - start) / schedule.fps) if subtitles else None
+        key = scene_hash(renderer, i, start, end, ass_text)
+        segment_path = os.path.join(job_dir, f"scene_{i:05d}.mp4")
+        if os.path.exists(segment_path):
+            os.remove(segment_path)
+        segment_paths.append(segment_path)
+        if fetch_segment(key, segment_path):
+            trace.count("segment_cache.hit")
+            continue
+        trace.count("segment_cache.miss")
+
+        subtitles_path = None
+        if ass_text is not None:
+            subtitles_path = os.path.join(job_dir, f"scene_{i:05d}.ass")
+            with open(subtitles_path, "w", encoding="utf-8") as f:
+                f.write(ass_text)
+        tasks.append((start, end, segment_path, subtitles_path))
+        new_segments.append((key, segment_path))
+
+    reused = len(segment_paths) - len(tasks)
+    print(f"   -> {reused} dari {len(segment_paths)} adegan diambil dari cache, {len(tasks)} dirender ulang.")
+
+    try:
+        render_segment_tasks(timeline, schedule, seed, tasks, workers)
+        for key, segment_path in new_segments:
+            store_segment(key, segment_path)
+        evict_lru(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES, suffix=".mp4")
+        concat_segments(segment_paths, output_video)
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+    print("✅ Rendering video percakapan selesai.")
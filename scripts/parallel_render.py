@@ -0,0 +1,117 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from scripts import trace
+from scripts.compositor import frame_nbytes
+from scripts.render_frames_pipe import FrameRenderer, pipe_pixel_format
+
+# Jumlah frame unik per tugas worker.
+CHUNK_FRAMES = 4
+# Jumlah slot buffer bersama per worker (1 sedang dikerjakan + 1 menunggu ditulis).
+SLOTS_PER_WORKER = 2
+
+# State per proses worker: renderer yang sudah hangat dan view ke shared memory.
+_worker_renderer = None
+_worker_shm = None
+_worker_slots = None
+
+
+def _init_worker(timeline, schedule, seed, shm_name, slot_shape, tracing=False):
+    global _worker_renderer, _worker_shm, _worker_slots
+    if tracing:
+        trace.enable()
+    # Worker memakai resource tracker milik proses induk, jadi segmen hanya
+    # dihapus sekali oleh induk lewat unlink().
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_slots = np.ndarray(slot_shape, dtype=np.uint8, buffer=_worker_shm.buf)
+    _worker_renderer = FrameRenderer(timeline, schedule, seed)
+
+
+def _render_chunk(states, slot):
+    """
+    Menyusun setiap status visual di `states` langsung ke slot shared memory `slot`.
+    Mengembalikan data trace worker (jika tracing aktif) untuk digabung proses induk.
+    """
+    frames = _worker_slots[slot]
+    for i, state in enumerate(states):
+        _worker_renderer.compose_state(state)
+        np.copyto(frames[i], _worker_renderer.compositor.output)
+    if trace.is_enabled():
+        return trace.collect()
+    return None
+
+
+def pool_context():
+    # fork mewarisi modul yang sudah diimpor sehingga worker siap lebih cepat.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def render_parallel(timeline, schedule, seed, runs, stream, workers, progress=None, chunk_frames=CHUNK_FRAMES):
+    """
+    Merender `runs` (hasil FrameRenderer.plan_runs) dengan `workers` proses dan
+    menulis frame-nya berurutan ke `stream`.
+
+    Frame unik dipecah menjadi potongan kecil. Setiap worker menulis hasilnya ke
+    slot di shared memory (bukan di-pickle), lalu proses induk menulis slot-slot
+    itu ke `stream` sesuai urutan frame, diulang sebanyak jumlah frame di run-nya
+    (frame duplikat tidak disusun ulang, tetapi tetap dikirim utuh ke pipe).
+    """
+    if not runs:
+        return
+
+    W, H = timeline["width"], timeline["height"]
+    slot_count = workers * SLOTS_PER_WORKER
+    slot_shape = (slot_count, chunk_frames, frame_nbytes(W, H, pipe_pixel_format(timeline)))
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(slot_shape)))
+    slots = np.ndarray(slot_shape, dtype=np.uint8, buffer=shm.buf)
+
+    chunks = iter([runs[i:i + chunk_frames] for i in range(0, len(runs), chunk_frames)])
+    free_slots = list(range(slot_count))
+    pending = deque()
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=pool_context(),
+            initializer=_init_worker,
+            initargs=(timeline, schedule, seed, shm.name, slot_shape, trace.is_enabled()),
+        ) as pool:
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                slot = free_slots.pop()
+                states = [state for _, _, state in chunk]
+                pending.append((pool.submit(_render_chunk, states, slot), chunk, slot))
+                return True
+
+            while free_slots and submit_next():
+                pass
+
+            while pending:
+                future, chunk, slot = pending.popleft()
+                # Waktu menunggu di sini berarti worker lebih lambat dari encoder.
+                with trace.span("parallel.wait_chunk", "render"):
+                    trace.merge(future.result())
+                for i, (_, frame_count, _) in enumerate(chunk):
+                    frame_bytes = memoryview(slots[slot, i]).cast("B")
+                    with trace.span("pipe.write", "io"):
+                        for _ in range(frame_count):
+                            stream.write(frame_bytes)
+                    trace.count("pipe.bytes", frame_count * frame_bytes.nbytes)
+                    trace.count("frames.written", frame_count)
+                    frame_bytes.release()
+                    if progress is not None:
+                        progress.update(frame_count)
+                free_slots.append(slot)
+                submit_next()
+    finally:
+        del slots
+        shm.close()
+        shm.unlink()
@@ -4,6 +4,8 @@ import wave
 from gtts import gTTS
 from pydub import AudioSegment
 
+from scripts.cache import audio_key, load_cached_audio, store_cached_audio
+
 OUTPUT_DIR = "output"
 SCENES_DIR = os.path.join(OUTPUT_DIR, "scenes")
 os.makedirs(SCENES_DIR, exist_ok=True)
@@ -41,6 +43,15 @@ def process_audio_and_update_timeline(timeline, character_map):
             if not character_map.get(speaker_id):
                 raise ValueError(f"Detail untuk karakter '{speaker_id}' tidak ditemukan.")
 
+            # Jalur ini tidak mengubah nada, jadi dicache dengan pitch 1.0.
+            key = audio_key(text, "id", "gtts", 1.0)
+            cached_duration = load_cached_audio(key, scene_audio_path)
+            if cached_duration is not None:
+                scene_audio_files.append(scene_audio_path)
+                scene["duration"] = round(cached_duration, 2)
+                updated_scenes.append(scene)
+                continue
+
             tts = gTTS(text=text, lang='id', slow=False)
             temp_mp3_path = os.path.join(SCENES_DIR, f"scene_{i}_temp.mp3")
             tts.save(temp_mp3_path)
@@ -55,6 +66,7 @@ def process_audio_and_update_timeline(timeline, character_map):
 
                 # Lanjutkan untuk mengekspor ke WAV
                 audio.export(scene_audio_path, format="wav")
+                store_cached_audio(key, scene_audio_path)
 
             except Exception as e:
                 print(f"Error converting MP3 to WAV or getting duration for scene {i}: {e}")
@@ -0,0 +1,271 @@
+import re
+
+import numpy as np
+
+from scripts.compositor import FrameCompositor
+from scripts.raster_cache import cached_raster, raster_key
+from scripts.svg_template import ROOT_ID
+
+# Mode puppet: bagian tubuh yang dianimasikan AnimationRig (kepala, lengan,
+# kaki, ...) dirasterisasi sekali sebagai lapisan terpisah, lalu setiap frame
+# cukup memutar/menggeser raster lapisan itu dengan resampling affine bilinear
+# di NumPy. Sudut baru tidak lagi membutuhkan rasterisasi SVG.
+
+# Kuantisasi kurva animasi di mode puppet relatif terhadap mode SVG (lebih halus).
+PUPPET_STEP_SCALE = 0.25
+
+# Elemen yang tidak digambar langsung; tidak perlu masuk ke lapisan mana pun.
+_NON_RENDERED = {"defs", "title", "desc", "metadata", "style", "script", "symbol", "marker", "pattern",
+                 "clipPath", "mask", "filter", "linearGradient", "radialGradient"}
+
+_TRANSFORM_PATTERN = re.compile(r"(matrix|rotate|translate|scale)\s*\(([^)]*)\)")
+
+
+def parse_transform(value):
+    """Mengubah atribut transform SVG (matrix/rotate/translate/scale) menjadi matriks 3x3."""
+    matrix = np.eye(3)
+    for name, args in _TRANSFORM_PATTERN.findall(value or ""):
+        numbers = [float(n) for n in re.split(r"[\s,]+", args.strip()) if n]
+        if name == "matrix":
+            a, b, c, d, e, f = numbers[:6]
+            step = np.array([[a, c, e], [b, d, f], [0, 0, 1]], dtype=np.float64)
+        elif name == "translate":
+            tx, ty = numbers[0], numbers[1] if len(numbers) > 1 else 0.0
+            step = np.array([[1, 0, tx], [0, 1, ty], [0, 0, 1]], dtype=np.float64)
+        elif name == "scale":
+            sx = numbers[0]
+            sy = numbers[1] if len(numbers) > 1 else sx
+            step = np.diag([sx, sy, 1.0])
+        else:
+            angle = np.radians(numbers[0])
+            cx, cy = (numbers[1], numbers[2]) if len(numbers) > 2 else (0.0, 0.0)
+            cos, sin = np.cos(angle), np.sin(angle)
+            step = np.array([
+                [cos, -sin, cx - cos * cx + sin * cy],
+                [sin, cos, cy - sin * cx - cos * cy],
+                [0, 0, 1],
+            ])
+        matrix = matrix @ step
+    return matrix
+
+
+def viewbox_matrix(root, width, height):
+    """Matriks dari satuan viewBox SVG ke piksel raster (preserveAspectRatio xMidYMid meet)."""
+    viewbox = root.get("viewBox")
+    if viewbox:
+        vx, vy, vw, vh = (float(n) for n in re.split(r"[\s,]+", viewbox.strip()))
+    else:
+        vx, vy = 0.0, 0.0
+        vw = float(re.sub(r"[^\d.]", "", root.get("width", "")) or width)
+        vh = float(re.sub(r"[^\d.]", "", root.get("height", "")) or height)
+    scale = min(width / vw, height / vh)
+    offset_x = (width - scale * vw) / 2 - scale * vx
+    offset_y = (height - scale * vh) / 2 - scale * vy
+    return np.array([[scale, 0, offset_x], [0, scale, offset_y], [0, 0, 1]])
+
+
+def alpha_box(raster):
+    """Kotak (x0, y0, x1, y1) piksel yang tidak transparan, atau None jika kosong."""
+    alpha = raster[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not rows.size:
+        return None
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def affine_resample(padded, box, matrix, width, height):
+    """
+    Menerapkan `matrix` (3x3, piksel sumber -> piksel tujuan) pada raster
+    premultiplied dengan interpolasi bilinear, yang sekaligus menghaluskan tepi
+    (anti-aliasing). `padded` adalah raster float32 dengan bingkai 1 piksel
+    bernilai nol, `box` kotak isi raster sumber. Hanya area tujuan yang bisa
+    terkena isi tersebut yang dihitung. Mengembalikan (raster uint8, x0, y0).
+    """
+    x0, y0, x1, y1 = box
+    corners = matrix @ np.array([[x0, x1, x0, x1], [y0, y0, y1, y1], [1, 1, 1, 1]], dtype=np.float64)
+    out_x0 = max(int(np.floor(corners[0].min())) - 1, 0)
+    out_y0 = max(int(np.floor(corners[1].min())) - 1, 0)
+    out_x1 = min(int(np.ceil(corners[0].max())) + 1, width)
+    out_y1 = min(int(np.ceil(corners[1].max())) + 1, height)
+    if out_x0 >= out_x1 or out_y0 >= out_y1:
+        return None, 0, 0
+
+    inverse = np.linalg.inv(matrix)
+    ys, xs = np.mgrid[out_y0:out_y1, out_x0:out_x1].astype(np.float32)
+    # Sampling di pusat piksel.
+    xs += 0.5
+    ys += 0.5
+    src_x = inverse[0, 0] * xs + inverse[0, 1] * ys + (inverse[0, 2] - 0.5)
+    src_y = inverse[1, 0] * xs + inverse[1, 1] * ys + (inverse[1, 2] - 0.5)
+
+    source_h, source_w = padded.shape[0] - 2, padded.shape[1] - 2
+    valid = (src_x > -1) & (src_x < source_w) & (src_y > -1) & (src_y < source_h)
+    ix = np.floor(src_x)
+    iy = np.floor(src_y)
+    fx = (src_x - ix)[..., None]
+    fy = (src_y - iy)[..., None]
+    # +1 karena bingkai; di luar raster jatuh ke bingkai nol atau disaring `valid`.
+    ix = np.clip(ix.astype(np.intp) + 1, 0, source_w)
+    iy = np.clip(iy.astype(np.intp) + 1, 0, source_h)
+
+    top = padded[iy, ix] * (1 - fx) + padded[iy, ix + 1] * fx
+    bottom = padded[iy + 1, ix] * (1 - fx) + padded[iy + 1, ix + 1] * fx
+    value = top * (1 - fy) + bottom * fy
+    value *= valid[..., None]
+    out = np.clip(np.rint(value), 0, 255).astype(np.uint8)
+    return out, out_x0, out_y0
+
+
+class PuppetLayer:
+    __slots__ = ("raster", "padded", "box")
+
+    def __init__(self, raster):
+        self.raster = raster
+        self.box = alpha_box(raster)
+        self.padded = None
+        if self.box is not None:
+            self.padded = np.zeros((raster.shape[0] + 2, raster.shape[1] + 2, 4), dtype=np.float32)
+            self.padded[1:-1, 1:-1] = raster
+
+
+class Puppet:
+    """
+    Satu karakter (SvgTemplate) sebagai tumpukan lapisan raster untuk satu ukuran sprite.
+
+    Bagian yang dianimasikan adalah target AnimationRig teratas (yang tidak
+    berada di dalam target lain). Dokumen SVG dipecah mengikuti urutannya:
+    setiap bagian menjadi satu lapisan, dan isi statis di antara bagian-bagian
+    itu menjadi lapisan statis, sehingga urutan gambar (z-order) sama dengan
+    SVG aslinya. Transform target bersarang tetap diterapkan lewat SVG saat
+    lapisannya dirasterisasi.
+
+    Seperti override SVG biasa, transform AnimationRig menggantikan atribut
+    `transform` bawaan bagian itu dan berlaku di sistem koordinat induknya
+    (CTM induk), jadi pivot rotasi punya arti yang sama di kedua mode.
+    """
+
+    def __init__(self, template, rig, width, height):
+        self.template = template
+        self.rig = rig
+        self.width = width
+        self.height = height
+        to_pixels = viewbox_matrix(template.root, width, height)
+
+        parents = {child: parent for parent in template.root.iter() for child in parent}
+        targets = {element_id for _, _, _, channel_targets in rig.channels for element_id, _, _ in channel_targets}
+        target_elements = {template.elements[element_id]: element_id for element_id in targets}
+
+        def has_target_ancestor(element):
+            parent = parents.get(element)
+            while parent is not None:
+                if parent in target_elements:
+                    return True
+                parent = parents.get(parent)
+            return False
+
+        part_elements = {e: element_id for e, element_id in target_elements.items() if not has_target_ancestor(e)}
+
+        # Matriks per bagian: piksel = to_pixels @ CTM induk @ transform, dengan
+        # transform bawaan diganti transform rig; `_unposed` membatalkan transform
+        # bawaan dari raster lapisan.
+        self._posed = {}
+        self._unposed = {}
+        for element, element_id in part_elements.items():
+            parent_ctm = np.eye(3)
+            ancestor = parents.get(element)
+            while ancestor is not None and ancestor is not template.root:
+                parent_ctm = parse_transform(ancestor.get("transform")) @ parent_ctm
+                ancestor = parents.get(ancestor)
+            to_layer = to_pixels @ parent_ctm @ parse_transform(element.get("transform"))
+            self._posed[element_id] = to_pixels @ parent_ctm
+            self._unposed[element_id] = np.linalg.inv(to_layer)
+
+        # Tumpukan lapisan dalam urutan dokumen: id bagian, atau list kunci elemen
+        # statis (subpohon tanpa bagian) yang berurutan.
+        self.stack = []
+        # Elemen yang berisi bagian (termasuk <svg>) selalu disembunyikan; isinya
+        # ditampilkan per lapisan lewat visibility pada elemen yang dipilih.
+        self._containers = [ROOT_ID]
+
+        def split(element):
+            for child in element:
+                if child in part_elements:
+                    self.stack.append(part_elements[child])
+                elif any(e in part_elements for e in child.iter()):
+                    self._containers.append(template.element_key(child))
+                    split(child)
+                elif child.get("visibility") != "hidden" and child.tag.rsplit("}", 1)[-1] not in _NON_RENDERED:
+                    if not self.stack or not isinstance(self.stack[-1], list):
+                        self.stack.append([])
+                    self.stack[-1].append(template.element_key(child))
+
+        split(template.root)
+        self.parts = [entry for entry in self.stack if not isinstance(entry, list)]
+
+        self._layers = {}
+        self._canvas = FrameCompositor(width, height, background=np.zeros((height, width, 4), dtype=np.uint8))
+
+    def __bool__(self):
+        return bool(self.parts)
+
+    def _render_layer(self, overrides):
+        svg_string = self.template.render(overrides)
+        return PuppetLayer(cached_raster(
+            raster_key(self.template.source, self.width, self.height, overrides),
+            lambda: self._rasterize(svg_string)
+        ))
+
+    def _rasterize(self, svg_string):
+        from scripts.render_frames_pipe import svg_to_rgba
+        return svg_to_rgba(svg_string, self.width, self.height)
+
+    def layers(self, base_overrides, nested_overrides):
+        """Lapisan untuk satu pose (sejajar dengan `self.stack`), dirasterisasi sekali lalu disimpan."""
+        key = (tuple(sorted(base_overrides.items(), key=str)), tuple(sorted(nested_overrides.items())))
+        layers = self._layers.get(key)
+        if layers is None:
+            hidden = {(element_key, "visibility"): "hidden" for element_key in self._containers + self.parts}
+            overrides = {**base_overrides, **nested_overrides, **hidden}
+            layers = []
+            for entry in self.stack:
+                shown = entry if isinstance(entry, list) else [entry]
+                layers.append(self._render_layer({
+                    **overrides, **{(element_key, "visibility"): "visible" for element_key in shown},
+                }))
+            self._layers[key] = layers
+        return layers
+
+    def part_matrix(self, element_id, transform):
+        """Matriks piksel raster lapisan -> piksel sprite jika `transform` menggantikan transform bawaan bagian."""
+        return self._posed[element_id] @ parse_transform(transform) @ self._unposed[element_id]
+
+    def render(self, base_overrides, params):
+        """
+        Menyusun sprite dari lapisan raster: transform AnimationRig untuk setiap
+        bagian (satu baris `params`) diterapkan dengan resampling affine.
+        """
+        transforms = {}
+        self.rig.apply(params, transforms)
+        part_matrices = {}
+        nested_overrides = {}
+        for (element_id, attribute), value in transforms.items():
+            if element_id in self._posed:
+                part_matrices[element_id] = self.part_matrix(element_id, value)
+            else:
+                nested_overrides[(element_id, attribute)] = value
+        layers = self.layers(base_overrides, nested_overrides)
+
+        canvas = self._canvas
+        canvas.begin_frame()
+        for entry, layer in zip(self.stack, layers):
+            if layer.box is None:
+                continue
+            matrix = None if isinstance(entry, list) else part_matrices.get(entry)
+            if matrix is None:
+                canvas.blend(layer.raster, 0, 0)
+                continue
+            raster, x, y = affine_resample(layer.padded, layer.box, matrix, self.width, self.height)
+            if raster is not None:
+                canvas.blend(raster, x, y)
+        return canvas.frame.copy()
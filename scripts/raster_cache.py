@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from scripts import trace
+from scripts.cache import evict_lru
+
+# Cache raster di disk: hasil rasterisasi SVG (RGBA premultiplied) disimpan
+# sebagai file .npy dan dibuka dengan memory mapping, jadi tidak ada dekode PNG
+# maupun panggilan cairosvg untuk aset yang pernah dirender. Dibagi oleh semua
+# proses render dan tetap ada antar-proses (termasuk container baru jika
+# direktori ini berada di volume bersama).
+RASTER_CACHE_DIR = "cache/rasters"
+RASTER_CACHE_MAX_BYTES = int(os.environ.get("RASTER_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+# RASTER_CACHE=0 mematikan cache, misalnya untuk mengukur rasterisasi dingin.
+RASTER_CACHE_ENABLED = os.environ.get("RASTER_CACHE", "1") != "0"
+# Naikkan jika cara merasterisasi berubah sehingga entri lama tidak lagi valid.
+RASTER_FORMAT_VERSION = 1
+CHARACTERS_PATH = "characters.json"
+
+
+def raster_key(svg_source, width, height, overrides=None):
+    """Kunci cache: hash isi SVG sumber, ukuran keluaran, dan override atribut yang diterapkan."""
+    content = hashlib.sha256(svg_source.encode("utf-8")).hexdigest()
+    applied = sorted([element_id, attribute, value] for (element_id, attribute), value in (overrides or {}).items())
+    payload = json.dumps([RASTER_FORMAT_VERSION, content, int(width), int(height), applied], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_raster(key):
+    """Membuka raster dari cache sebagai array read-only yang di-memory-map, atau None jika tidak ada."""
+    path = os.path.join(RASTER_CACHE_DIR, f"{key}.npy")
+    try:
+        with trace.span("raster_cache.load", "svg"):
+            raster = np.load(path, mmap_mode="r")
+        # Tandai sebagai baru dipakai untuk eviction LRU.
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Entri cache raster rusak ({path}): {e}")
+        return None
+    return raster
+
+
+def store_raster(key, raster):
+    """Menyimpan raster ke cache secara atomik, lalu menjaga batas ukuran cache."""
+    os.makedirs(RASTER_CACHE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=RASTER_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(raster))
+        os.replace(temp_path, os.path.join(RASTER_CACHE_DIR, f"{key}.npy"))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    evict_lru(RASTER_CACHE_DIR, RASTER_CACHE_MAX_BYTES, suffix=".npy")
+
+
+def cached_raster(key, render_fn):
+    """Mengembalikan raster dari cache disk, atau merendernya lewat `render_fn()` lalu menyimpannya."""
+    if not RASTER_CACHE_ENABLED:
+        return render_fn()
+    raster = load_raster(key)
+    if raster is not None:
+        trace.count("raster_cache.hit")
+        return raster
+    trace.count("raster_cache.miss")
+    raster = render_fn()
+    try:
+        store_raster(key, raster)
+    except OSError as e:
+        # Cache hanya optimasi: disk penuh atau read-only tidak boleh menggagalkan render.
+        print(f"⚠️ Gagal menyimpan cache raster: {e}")
+    return raster
+
+
+def warm_cache(characters_path=CHARACTERS_PATH, resolutions=None):
+    """
+    Merasterisasi latar belakang dan setiap pose karakter (semua varian SVG x
+    tingkat mulut x kedipan) di characters.json untuk setiap resolusi render,
+    sehingga render berikutnya tidak perlu memanggil cairosvg sama sekali.
+    Mengembalikan jumlah raster yang diperiksa.
+    """
+    import main
+    from scripts.audio_envelope import MOUTH_LEVELS
+    from scripts.render_frames_pipe import character_render_size, load_background, load_svg_template, render_pose
+
+    with open(characters_path, encoding="utf-8") as f:
+        characters_data = json.load(f)
+    if resolutions is None:
+        resolutions = main.render_resolutions()
+
+    svg_paths = sorted({path for char in characters_data.get("characters", [])
+                        for path in char.get("svgs", {}).values() if path})
+    templates = [t for t in (load_svg_template(path) for path in svg_paths) if t is not None]
+
+    total = 0
+    for width, height in resolutions:
+        if load_background(characters_data.get("background"), width, height) is not None:
+            total += 1
+        char_w, char_h = character_render_size(width)
+        for template in templates:
+            for mouth_level in range(MOUTH_LEVELS):
+                for is_blinking in (False, True):
+                    render_pose(template, mouth_level, is_blinking, char_w, char_h)
+                    total += 1
+        print(f"   -> {width}x{height}: latar belakang & {len(templates)} SVG karakter siap.")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache raster SVG di disk.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm = subparsers.add_parser("warm", help="Merasterisasi semua aset characters.json untuk setiap resolusi render")
+    warm.add_argument("--characters", default=CHARACTERS_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "warm":
+        print(f"🔥 Memanaskan cache raster di {RASTER_CACHE_DIR}...")
+        total = warm_cache(args.characters)
+        print(f"✅ {total} raster siap di cache.")
+
+
+if __name__ == "__main__":
+    main()
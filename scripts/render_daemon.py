@@ -0,0 +1,125 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import socket
+import traceback
+
+# Daemon didaur ulang (keluar lalu dijalankan ulang oleh bot) setelah sekian job
+# atau ketika memori residennya melewati batas ini.
+DEFAULT_MAX_JOBS = 50
+DEFAULT_MAX_RSS_MB = 1536
+# Panjang maksimum log job yang dikirim balik ke klien.
+LOG_TAIL_CHARS = 4000
+CHARACTERS_PATH = "characters.json"
+
+
+def rss_mb():
+    """Memori residen proses saat ini (MB); jatuh ke nilai puncak jika /proc tidak tersedia."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def warm_up(characters_path=CHARACTERS_PATH):
+    """Mengimpor modul berat dan memuat aset ke cache proses sebelum job pertama."""
+    import main
+    from scripts import render_frames_pipe, tts_audio  # noqa: F401
+
+    try:
+        with open(characters_path, encoding="utf-8") as f:
+            characters_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"⚠️ Gagal memuat {characters_path} untuk pemanasan: {e}")
+        return
+
+    for char in characters_data.get("characters", []):
+        for svg_path in char.get("svgs", {}).values():
+            render_frames_pipe.load_svg_template(svg_path)
+    # Latar belakang & atlas sprite untuk setiap orientasi di setiap tingkat kualitas.
+    for width, height in main.render_resolutions():
+        render_frames_pipe.load_background(characters_data.get("background"), width, height)
+        render_frames_pipe.load_atlas(*render_frames_pipe.character_render_size(width))
+
+
+def run_job(args):
+    """
+    Menjalankan `main.main(args)` di dalam proses ini dengan argumen CLI `args`.
+    Mengembalikan (berhasil, log). Modul yang sudah diimpor dan cache aset dipakai ulang.
+    """
+    import main
+
+    log = io.StringIO()
+    ok = True
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            main.main(list(args))
+        except SystemExit as e:
+            # argparse keluar lewat SystemExit untuk argumen tidak valid.
+            ok = e.code in (None, 0)
+        except Exception:
+            traceback.print_exc()
+            ok = False
+    return ok, log.getvalue()[-LOG_TAIL_CHARS:]
+
+
+def serve(socket_path, max_jobs=DEFAULT_MAX_JOBS, max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """
+    Melayani job satu per satu lewat Unix socket. Setiap koneksi mengirim satu
+    baris JSON `{"args": [...]}` dan menerima satu baris JSON
+    `{"ok": bool, "log": str}`. Setelah `max_jobs` job atau ketika memori melewati
+    `max_rss_mb`, daemon berhenti agar bisa dijalankan ulang dalam keadaan bersih.
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    # Socket sudah menerima koneksi selama pemanasan; job pertama cukup menunggu di antrean.
+    server.listen()
+
+    try:
+        warm_up()
+        print(f"🔥 Render daemon siap di {socket_path} (RSS {rss_mb():.0f} MB).", flush=True)
+
+        jobs_done = 0
+        while jobs_done < max_jobs:
+            conn, _ = server.accept()
+            with conn, conn.makefile("rwb") as stream:
+                line = stream.readline()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                    ok, log = run_job(request.get("args", []))
+                except json.JSONDecodeError as e:
+                    ok, log = False, f"Permintaan tidak valid: {e}"
+                stream.write(json.dumps({"ok": ok, "log": log}, ensure_ascii=False).encode("utf-8") + b"\n")
+                stream.flush()
+            jobs_done += 1
+
+            current_rss = rss_mb()
+            if current_rss >= max_rss_mb:
+                print(f"♻️ Render daemon memakai {current_rss:.0f} MB, didaur ulang.", flush=True)
+                break
+        else:
+            print(f"♻️ Render daemon selesai {jobs_done} job, didaur ulang.", flush=True)
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Proses render jangka panjang dengan import & cache aset yang tetap hangat.")
+    parser.add_argument("--socket", required=True, help="Path Unix socket yang dilayani")
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS,
+                        help="Jumlah job sebelum daemon didaur ulang")
+    parser.add_argument("--max-rss-mb", type=int, default=DEFAULT_MAX_RSS_MB,
+                        help="Batas memori residen (MB) sebelum daemon didaur ulang")
+    args = parser.parse_args()
+    serve(args.socket, args.max_jobs, args.max_rss_mb)
@@ -1,181 +1,568 @@
+import argparse
+import io
 import os
 import json
 import random
 import subprocess
+import tempfile
+import numpy as np
 from tqdm import tqdm
 from PIL import Image
 from cairosvg import svg2png
 import sys
 import xml.etree.ElementTree as ET
+from scripts import trace
+from scripts.animation_rig import AnimationRig
+from scripts.audio_envelope import MOUTH_LEVELS, load_scene_mouth_levels
+from scripts.compositor import FrameCompositor, premultiply
+from scripts.puppet import PUPPET_STEP_SCALE, Puppet
+from scripts.raster_cache import cached_raster, raster_key
+from scripts.scene_schedule import DEFAULT_FPS, SceneSchedule
+from scripts.sprite_atlas import load_atlas
+from scripts.sprite_cache import SpriteCache
+from scripts.svg_emotion import apply_mouth
+from scripts.svg_template import SvgTemplate
 
 # --- Konstanta Animasi ---
 BLINK_INTERVAL_SECONDS = 3.5
 BLINK_DURATION_FRAMES = 3
-FPS = 24
+FPS = DEFAULT_FPS
+# Parameter encoder video; dipakai juga oleh setiap segmen agar bisa disambung dengan -c copy.
+# Preset x264 (timeline["encoder_preset"], diatur oleh tingkat kualitas) ditambahkan terpisah.
+ENCODER_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18']
+# Format piksel pipe ke ffmpeg (timeline["pipe_format"]): "rgba" atau "yuv420p".
+DEFAULT_PIPE_FORMAT = "rgba"
+# Seed default untuk posisi karakter & jadwal kedipan (bisa diganti lewat timeline["seed"]).
+DEFAULT_SEED = 0
+# Jumlah karakter akhir stderr ffmpeg yang disertakan dalam pesan galat.
+FFMPEG_ERROR_TAIL = 2000
 
-def set_element_style(svg_content, element_id, style_string):
+# --- Cache Tingkat Proses ---
+# Pada render biasa hanya hidup selama satu render; di render daemon
+# (scripts/render_daemon.py) isinya tetap hangat dari satu job ke job berikutnya.
+_svg_templates = {}
+_backgrounds = {}
+shared_sprite_cache = SpriteCache()
+
+def clear_process_caches():
+    """Mengosongkan cache tingkat proses, misalnya untuk mengukur render dalam keadaan dingin."""
+    _svg_templates.clear()
+    _backgrounds.clear()
+    shared_sprite_cache.clear()
+
+def load_svg_template(svg_path):
     """
-    Secara aman mengatur atribut style untuk elemen SVG menggunakan parser XML.
-    Ini adalah metode yang andal untuk menghindari error `duplicate attribute`.
+    Mem-parse file SVG menjadi SvgTemplate, sekali per versi file (mtime).
+    Mengembalikan None jika gagal.
     """
+    if not svg_path or not os.path.exists(svg_path):
+        return None
+    mtime = os.path.getmtime(svg_path)
+    cached = _svg_templates.get(svg_path)
+    if cached is not None and cached[0] == mtime:
+        trace.count("svg.template_cache_hit")
+        return cached[1]
     try:
-        # Daftarkan namespace default untuk menghindari {http://www.w3.org/2000/svg} di tag
-        ET.register_namespace("", "http://www.w3.org/2000/svg")
-        root = ET.fromstring(svg_content)
-        
-        # Gunakan findall dengan wildcard namespace untuk menemukan elemen berdasarkan ID
-        # Ini lebih kuat daripada mengasumsikan tidak ada namespace
-        target_elements = root.findall(f".//*[@id='{element_id}']")
-        
-        if target_elements:
-            # Timpa atau tambahkan atribut style
-            target_elements[0].set("style", style_string)
-        
-        # Kembalikan konten sebagai string
-        return ET.tostring(root, encoding='unicode')
+        with trace.span("svg.parse", "svg", path=svg_path):
+            template = SvgTemplate.from_file(svg_path)
     except ET.ParseError as e:
-        print(f"XML Parse Error: {e} in SVG content for element {element_id}. Returning original SVG.")
-        return svg_content # Kembalikan konten asli jika ada error parsing
+        print(f"XML Parse Error: {e} in SVG file '{svg_path}'.")
+        template = None
+    _svg_templates[svg_path] = (mtime, template)
+    return template
+
+def load_background(svg_path, width, height):
+    """
+    Latar belakang sebagai RGBA premultiplied, dirasterisasi sekali per file &
+    resolusi (dan diambil dari cache raster di disk jika sudah pernah dirender).
+    """
+    if not svg_path or not os.path.exists(svg_path):
+        return None
+    key = (svg_path, os.path.getmtime(svg_path), width, height)
+    if key not in _backgrounds:
+        with open(svg_path, "r", encoding='utf-8') as f:
+            svg_string = f.read()
+        _backgrounds[key] = cached_raster(raster_key(svg_string, width, height),
+                                          lambda: svg_to_rgba(svg_string, width, height))
+    return _backgrounds[key]
 
 def svg_to_pil(svg_string, width, height):
     """Fungsi utilitas untuk merender SVG ke gambar PIL."""
     if width <= 0 or height <= 0:
         width, height = 1, 1
-    png_data = svg2png(bytestring=svg_string.encode('utf-8'), output_width=int(width), output_height=int(height))
-    temp_dir = "temp"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_png_path = os.path.join(temp_dir, f"temp_char_{random.randint(1,10000)}.png")
-    with open(temp_png_path, "wb") as f:
-        f.write(png_data)
-    img = Image.open(temp_png_path).convert("RGBA")
-    os.remove(temp_png_path)
-    return img
-
-def find_current_scene(timeline, global_frame_index):
-    """Menemukan adegan yang sedang berlangsung berdasarkan indeks frame global."""
-    accumulated_frames = 0
-    for scene in timeline["scenes"]:
-        num_frames = int(scene["duration"] * FPS)
-        if global_frame_index < accumulated_frames + num_frames:
-            local_frame_index = global_frame_index - accumulated_frames
-            return scene, local_frame_index
-        accumulated_frames += num_frames
-    return timeline["scenes"][-1], global_frame_index - (accumulated_frames - int(timeline["scenes"][-1]["duration"]*FPS))
-
-def render_all(timeline, output_video):
-    W, H = timeline["width"], timeline["height"]
-    char_data_map = {char["id"]: char for char in timeline["characters"]}
-    char_svg_strings = {}
-    for char_id, char_data in char_data_map.items():
-        svg_path = char_data.get("svgs", {}).get("default")
-        if svg_path and os.path.exists(svg_path):
-            with open(svg_path, "r", encoding='utf-8') as f:
-                char_svg_strings[char_id] = f.read()
-        else:
-            print(f"⚠️ SVG default untuk {char_id} tidak ditemukan di '{svg_path}'.")
+    trace.count("svg.rasterizations")
+    with trace.span("svg.rasterize", "svg"):
+        png_data = svg2png(bytestring=svg_string.encode('utf-8'), output_width=int(width), output_height=int(height))
+    # Dekode PNG langsung dari memori, tanpa file sementara.
+    with trace.span("png.decode", "svg"):
+        return Image.open(io.BytesIO(png_data)).convert("RGBA")
+
+def svg_to_rgba(svg_string, width, height):
+    """Merender SVG menjadi array NumPy RGBA premultiplied, siap dipakai FrameCompositor."""
+    return premultiply(np.asarray(svg_to_pil(svg_string, width, height)))
+
+def pose_overrides(mouth_level, is_blinking):
+    """Override atribut untuk tingkat bukaan mulut (0..MOUTH_LEVELS-1) & status mata."""
+    eye_style = 'transform: scaleY(1);' # Default mata terbuka
+    if is_blinking:
+        eye_style = 'transform: scaleY(0.05); transform-origin: center;'
 
-    character_positions = {}
-    num_chars = len(char_data_map)
-    slot_width = W / max(1, num_chars)
-    for i, char_id in enumerate(char_data_map.keys()):
+    overrides = {('eyes', 'style'): eye_style}
+    apply_mouth(overrides, mouth_level / (MOUTH_LEVELS - 1))
+    return overrides
+
+def render_pose(template, mouth_level, is_blinking, width, height, rig=None, params=()):
+    """
+    Menerapkan tingkat bukaan mulut (0..MOUTH_LEVELS-1), status mata, dan satu
+    baris parameter AnimationRig (`params`) pada SvgTemplate karakter lalu
+    merasterisasinya (atau mengambilnya dari cache raster di disk).
+    """
+    overrides = pose_overrides(mouth_level, is_blinking)
+    if rig is not None:
+        rig.apply(params, overrides)
+    return cached_raster(raster_key(template.source, width, height, overrides),
+                         lambda: svg_to_rgba(template.render(overrides), width, height))
+
+def character_render_size(frame_width):
+    """Ukuran sprite karakter (lebar, tinggi) untuk frame selebar `frame_width`."""
+    char_w = int(frame_width * 0.3)
+    return char_w, int(char_w * 1.5)
+
+def pipe_pixel_format(timeline):
+    """Format piksel pipe untuk timeline ini; yuv420p hanya dipakai pada resolusi genap."""
+    pixel_format = timeline.get("pipe_format") or DEFAULT_PIPE_FORMAT
+    if pixel_format == "yuv420p" and (timeline["width"] % 2 or timeline["height"] % 2):
+        return "rgba"
+    return pixel_format
+
+def plan_character_positions(char_ids, width, seed=DEFAULT_SEED):
+    """Menentukan posisi horizontal tiap karakter di dalam slotnya secara deterministik."""
+    rng = random.Random(seed)
+    positions = {}
+    slot_width = width / max(1, len(char_ids))
+    for i, char_id in enumerate(char_ids):
         slot_start = i * slot_width
-        random_pos_in_slot = random.uniform(slot_start + slot_width * 0.15, slot_start + slot_width * 0.85)
-        character_positions[char_id] = int(random_pos_in_slot)
-
-    blink_schedules = {}
-    for char_id in char_data_map.keys():
-        first_blink_delay = random.uniform(0.5, BLINK_INTERVAL_SECONDS) * FPS
-        blink_schedules[char_id] = int(first_blink_delay)
-
-    command = [
-        'ffmpeg', '-y', '-f', 'rawvideo', '-vcodec', 'rawvideo',
-        '-s', f'{W}x{H}', '-pix_fmt', 'rgba', '-r', str(FPS), '-i', '-',
-        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18', output_video
-    ]
-    pipe = subprocess.Popen(command, stdin=subprocess.PIPE)
-
-    background_img = Image.new("RGBA", (W, H), (0, 0, 0, 255))
-    if timeline.get("background") and os.path.exists(timeline["background"]):
-        with open(timeline["background"], "r", encoding='utf-8') as f:
-            bg_svg_string = f.read()
-        background_img = svg_to_pil(bg_svg_string, W, H)
-    else:
-        print("⚠️ Latar belakang tidak ditemukan. Menggunakan latar belakang hitam.")
-    
-    total_frames = sum(int(s.get("duration", 0) * FPS) for s in timeline["scenes"])
-    
-    for global_frame_index in tqdm(range(total_frames), desc="🎥 Merender Video"):
-        frame = background_img.copy()
-        current_scene, local_frame_index = find_current_scene(timeline, global_frame_index)
-        speaker_id = current_scene.get("speaker")
+        random_pos_in_slot = rng.uniform(slot_start + slot_width * 0.15, slot_start + slot_width * 0.85)
+        positions[char_id] = int(random_pos_in_slot)
+    return positions
+
+def plan_blinks(char_ids, total_frames, fps=FPS, seed=DEFAULT_SEED):
+    """
+    Menghitung jadwal kedipan `total_frames` frame di muka sebagai mask boolean
+    per karakter. Setiap karakter punya RNG sendiri, sehingga jadwalnya tidak
+    bergantung pada urutan render maupun jumlah proses yang dipakai.
+    """
+    masks = {}
+    for char_id in char_ids:
+        rng = random.Random(f"{seed}:{char_id}")
+        mask = np.zeros(total_frames, dtype=bool)
+        blink_start = int(rng.uniform(0.5, BLINK_INTERVAL_SECONDS) * fps)
+        while blink_start < total_frames:
+            mask[blink_start:blink_start + BLINK_DURATION_FRAMES] = True
+            next_blink_delay = rng.uniform(BLINK_INTERVAL_SECONDS * 0.5, BLINK_INTERVAL_SECONDS * 1.5) * fps
+            blink_start = blink_start + BLINK_DURATION_FRAMES + int(next_blink_delay)
+        masks[char_id] = mask
+    return masks
+
+class FrameRenderer:
+    """
+    Menyimpan state render yang sudah "hangat" (template SVG, sprite cache,
+    compositor, latar belakang) dan menyusun frame berdasarkan indeks global.
+
+    Semua keputusan acak (posisi karakter, jadwal kedipan) dihitung di muka dari
+    `seed`, sehingga frame yang sama selalu menghasilkan piksel yang sama, baik
+    dirender secara serial maupun oleh beberapa proses sekaligus.
+    """
+
+    def __init__(self, timeline, schedule, seed=DEFAULT_SEED, sprite_cache=None):
+        self.width, self.height = timeline["width"], timeline["height"]
+        self.encoder_preset = timeline.get("encoder_preset")
+        self.pixel_format = pipe_pixel_format(timeline)
+        # Mode puppet: bagian tubuh yang bergerak dianimasikan dengan transform raster.
+        self.puppet = bool(timeline.get("puppet"))
+        self.schedule = schedule
+        self.sprite_cache = sprite_cache if sprite_cache is not None else shared_sprite_cache
+        self.char_data_map = {char["id"]: char for char in timeline["characters"]}
+
+        # Parse setiap file SVG sekali saja, bukan setiap frame.
+        self.templates = {}
+        self.rigs = {}
+        self.puppets = {}
+        self.char_default_svgs = {}
+        for char_id, char_data in self.char_data_map.items():
+            svg_path = char_data.get("svgs", {}).get("default")
+            if self.load_svg(svg_path):
+                self.char_default_svgs[char_id] = svg_path
+            else:
+                print(f"⚠️ SVG default untuk {char_id} tidak ditemukan di '{svg_path}'.")
+
+        self.seed = seed
+        self.character_positions = plan_character_positions(list(self.char_data_map), self.width, seed)
+
+        # Lip sync: tingkat bukaan mulut per adegan dari envelope audio final.
+        # Tanpa audio, mulut pembicara dibuka-tutup secara berkala seperti semula.
+        self.mouth_levels = None
+        audio_path = timeline.get("audio")
+        if audio_path and os.path.exists(audio_path):
+            self.mouth_levels = load_scene_mouth_levels(audio_path, schedule.fps, schedule.durations,
+                                                        schedule.frame_counts)
+
+        # Compositor & latar belakang baru disiapkan saat frame pertama disusun,
+        # sehingga renderer juga bisa dipakai hanya untuk perencanaan.
+        self.background_path = timeline.get("background")
+        self._compositor = None
+
+        self.char_render_w, self.char_render_h = character_render_size(self.width)
+        # Atlas sprite (jika sudah dibangun) di-memory-map sekali per proses.
+        self.atlas = load_atlas(self.char_render_w, self.char_render_h)
+        self._scene_svgs = {}
+        self._scene_params = {}
+        self._scene_blinks = {}
+        self._missing_emotions = set()
+
+    def load_svg(self, svg_path):
+        if svg_path not in self.templates:
+            self.templates[svg_path] = load_svg_template(svg_path)
+        return self.templates[svg_path]
+
+    def rig(self, svg_path):
+        """AnimationRig untuk varian SVG ini, disusun sekali per file."""
+        if svg_path not in self.rigs:
+            step_scale = PUPPET_STEP_SCALE if self.puppet else 1.0
+            self.rigs[svg_path] = AnimationRig(self.templates[svg_path], step_scale)
+        return self.rigs[svg_path]
+
+    def puppet_for(self, svg_path):
+        """Puppet (lapisan raster) untuk varian SVG ini, disusun sekali per file."""
+        if svg_path not in self.puppets:
+            self.puppets[svg_path] = Puppet(self.templates[svg_path], self.rig(svg_path),
+                                            self.char_render_w, self.char_render_h)
+        return self.puppets[svg_path]
+
+    def scene_params(self, scene_index):
+        """
+        Tabel parameter animasi tiap karakter untuk seluruh frame sebuah adegan,
+        dievaluasi sekali per adegan: {id karakter: (baris, indeks)}. Gerakan
+        emosi & gestur hanya dimainkan oleh pembicara.
+        """
+        if scene_index in self._scene_params:
+            return self._scene_params[scene_index]
+        scene = self.schedule.scenes[scene_index]
+        frame_count = int(self.schedule.frame_counts[scene_index])
+        speaker_id = scene.get("speaker")
+        params = {}
+        for char_id, svg_path in self.scene_svgs(scene_index).items():
+            if char_id == speaker_id:
+                emotion, gesture = scene.get("emotion"), scene.get("gesture")
+            else:
+                emotion, gesture = None, None
+            params[char_id] = self.rig(svg_path).scene_params(frame_count, self.schedule.fps, emotion, gesture)
+        self._scene_params[scene_index] = params
+        return params
 
-        for char_id, char_data in char_data_map.items():
-            is_speaker = (char_id == speaker_id)
-            svg_to_render = None
-            if is_speaker:
+    def scene_blinks(self, scene_index):
+        """
+        Jadwal kedipan sebuah adegan dengan indeks frame lokal: {id karakter: mask}.
+        RNG-nya diturunkan dari seed & isi adegan (bukan posisinya di video), sehingga
+        mengubah adegan lain tidak menggeser kedipan adegan ini.
+        """
+        if scene_index not in self._scene_blinks:
+            scene = self.schedule.scenes[scene_index]
+            scene_seed = f"{self.seed}:{scene.get('speaker')}:{scene.get('text')}"
+            self._scene_blinks[scene_index] = plan_blinks(list(self.char_data_map),
+                                                          int(self.schedule.frame_counts[scene_index]),
+                                                          self.schedule.fps, scene_seed)
+        return self._scene_blinks[scene_index]
+
+    def scene_svgs(self, scene_index):
+        """Varian SVG tiap karakter untuk sebuah adegan, ditentukan sekali per adegan."""
+        if scene_index in self._scene_svgs:
+            return self._scene_svgs[scene_index]
+
+        current_scene = self.schedule.scenes[scene_index]
+        speaker_id = current_scene.get("speaker")
+        scene_svgs = {}
+        for char_id, char_data in self.char_data_map.items():
+            svg_path = self.char_default_svgs.get(char_id)
+            if char_id == speaker_id:
                 emotion = current_scene.get("emotion", "neutral")
-                svg_path = char_data.get("svgs", {}).get(emotion, char_data.get("svgs", {}).get("default"))
-                if svg_path and os.path.exists(svg_path):
-                    with open(svg_path, "r", encoding='utf-8') as f:
-                        svg_to_render = f.read()
-                else:
+                emotion_path = char_data.get("svgs", {}).get(emotion, char_data.get("svgs", {}).get("default"))
+                if self.load_svg(emotion_path):
+                    svg_path = emotion_path
+                elif (char_id, emotion) not in self._missing_emotions:
+                    self._missing_emotions.add((char_id, emotion))
                     print(f"⚠️ SVG untuk {char_id} (emosi: {emotion}) tidak ditemukan!")
-                    svg_to_render = char_svg_strings.get(char_id)
+            if svg_path:
+                scene_svgs[char_id] = svg_path
+        self._scene_svgs[scene_index] = scene_svgs
+        return scene_svgs
+
+    @property
+    def compositor(self):
+        if self._compositor is None:
+            self._compositor = FrameCompositor(self.width, self.height, pixel_format=self.pixel_format)
+            background = load_background(self.background_path, self.width, self.height)
+            if background is not None:
+                self._compositor.set_background(background)
             else:
-                svg_to_render = char_svg_strings.get(char_id)
+                print("⚠️ Latar belakang tidak ditemukan. Menggunakan latar belakang hitam.")
+        return self._compositor
 
-            if not svg_to_render:
+    def frame_state(self, scene_index, local_frame_index):
+        """
+        Status visual frame lokal ke-`local_frame_index` sebuah adegan: gestur
+        adegan dan pose setiap karakter (id, varian SVG, tingkat bukaan mulut,
+        sedang berkedip, parameter animasi terkuantisasi). Hanya bergantung pada
+        adegan itu sendiri, dan dua frame dengan status sama pasti menghasilkan
+        piksel yang sama.
+        """
+        scene = self.schedule.scenes[scene_index]
+        speaker_id = scene.get("speaker")
+        scene_blinks = self.scene_blinks(scene_index)
+        scene_params = self.scene_params(scene_index)
+        if self.mouth_levels is not None:
+            speaker_level = int(self.mouth_levels[scene_index][local_frame_index])
+        else:
+            speaker_level = MOUTH_LEVELS - 1 if (local_frame_index % 8) < 4 else 0
+        poses = []
+        for char_id, svg_path in self.scene_svgs(scene_index).items():
+            # 1. Animasi Mulut (hanya pembicara yang bergerak)
+            mouth_level = speaker_level if char_id == speaker_id else 0
+            # 2. Animasi Kedipan (sudah dijadwalkan di muka)
+            is_blinking = bool(scene_blinks[char_id][local_frame_index])
+            # 3. Kurva animasi (sudah dievaluasi per adegan)
+            rows, index = scene_params[char_id]
+            params = rows[index[local_frame_index]]
+            poses.append((char_id, svg_path, mouth_level, is_blinking, params))
+        return (scene.get("gesture"), tuple(poses))
+
+    def plan_runs(self, start=0, end=None):
+        """
+        Menghitung status visual setiap frame [start, end), adegan demi adegan, lalu
+        menggabungkan frame berurutan yang statusnya sama. Mengembalikan list
+        `[frame_awal, jumlah_frame, status]`; hanya frame awal tiap run yang perlu
+        disusun, sisanya cukup dikirim ulang ke ffmpeg. Yang dihemat adalah
+        penyusunan frame, bukan data pipe: setiap frame tetap dikirim utuh.
+        """
+        if end is None:
+            end = self.schedule.total_frames
+        runs = []
+        previous_state = None
+        for scene_index, _, scene_start, scene_end in self.schedule.iter_scenes():
+            if scene_end <= start or scene_start >= end:
                 continue
+            for global_frame_index in range(max(start, scene_start), min(end, scene_end)):
+                state = self.frame_state(scene_index, global_frame_index - scene_start)
+                if state == previous_state:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([global_frame_index, 1, state])
+                    previous_state = state
+        return runs
+
+    def pose_sprite(self, svg_path, mouth_level, is_blinking, params=()):
+        """Sprite sebuah pose: view ke atlas jika tersedia, selain itu dirasterisasi."""
+        # Atlas hanya berisi pose diam (semua kurva animasi bernilai 0).
+        if self.atlas is not None and not any(params):
+            sprite = self.atlas.get(svg_path, mouth_level, is_blinking)
+            if sprite is not None:
+                trace.count("sprite_atlas.hit")
+                return sprite
+        if self.puppet and any(params):
+            puppet = self.puppet_for(svg_path)
+            if puppet:
+                trace.count("puppet.frames")
+                with trace.span("puppet.render", "render"):
+                    return puppet.render(pose_overrides(mouth_level, is_blinking), params)
+        return render_pose(self.templates[svg_path], mouth_level, is_blinking, self.char_render_w, self.char_render_h,
+                           self.rig(svg_path), params)
+
+    def compose_state(self, state):
+        """
+        Menyusun frame untuk sebuah status visual ke `self.compositor.frame`.
+        Hanya area karakter yang berubah dari frame sebelumnya yang digambar ulang.
+        """
+        compositor = self.compositor
+        trace.count("frames.composed")
+        with trace.span("frame.compose", "render"):
+            size = (self.char_render_w, self.char_render_h)
+            layers = []
+
+            _, poses = state
+            for char_id, svg_path, mouth_level, is_blinking, params in poses:
+                # Setiap pose unik hanya dirasterisasi sekali, lalu diambil dari cache;
+                # tingkat mulut & kurva animasi yang terkuantisasi membatasi jumlah variasinya.
+                # Template (objek baru setiap kali file SVG berubah) ikut menjadi kunci agar
+                # cache bersama di render daemon tidak menyajikan sprite dari SVG lama.
+                pose_key = (char_id, self.templates[svg_path], mouth_level, is_blinking, params, size)
+                sprite = self.sprite_cache.get_or_render(
+                    pose_key, lambda: self.pose_sprite(svg_path, mouth_level, is_blinking, params)
+                )
+
+                sprite_h, sprite_w = sprite.shape[:2]
+                pos_x = self.character_positions[char_id]
+                pos_y = self.height - sprite_h - int(self.height * 0.05)
+                final_pos_x = pos_x - sprite_w // 2
+                final_pos_x = max(0, min(final_pos_x, self.width - sprite_w))
+                layers.append((sprite, final_pos_x, pos_y, pose_key))
+
+            with trace.span("frame.blend", "render"):
+                rects = compositor.compose(layers)
+            trace.count("frame.dirty_pixels", sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects))
+            if not rects:
+                trace.count("frames.unchanged")
+
+def parse_segments(value):
+    """Mengubah nilai opsi CLI --segments menjadi "scene", jumlah frame, atau None."""
+    if not value or value == "scene":
+        return value or None
+    try:
+        frames = int(value)
+    except ValueError:
+        raise ValueError(f"Nilai --segments tidak valid: {value!r} (gunakan 'scene' atau jumlah frame).")
+    if frames <= 0:
+        raise ValueError("Jumlah frame per segmen harus lebih dari 0.")
+    return frames
+
+def encoder_args(preset=None):
+    """Argumen encode video (ENCODER_ARGS, ditambah `-preset` jika diberikan) untuk setiap encode x264."""
+    return ENCODER_ARGS + (['-preset', preset] if preset else [])
+
+def encoder_command(width, height, fps, output_video, loglevel=None, audio_path=None, subtitles_path=None,
+                    preset=None, pixel_format=DEFAULT_PIPE_FORMAT):
+    """
+    Perintah ffmpeg yang menerima frame rawvideo (RGBA, atau yuv420p dengan
+    `pixel_format`) dari stdin dan meng-encode-nya.
+    Jika `audio_path` dan/atau `subtitles_path` diberikan, audio ikut di-mux dan
+    subtitle langsung di-burn dalam filtergraph yang sama (perakitan satu kali encode).
+    `preset` memilih preset x264 (misalnya "ultrafast" untuk draft).
+    """
+    command = ['ffmpeg', '-y']
+    if loglevel:
+        command += ['-loglevel', loglevel]
+    command += [
+        '-f', 'rawvideo', '-vcodec', 'rawvideo',
+        '-s', f'{width}x{height}', '-pix_fmt', pixel_format, '-r', str(fps), '-i', '-',
+    ]
+    if audio_path:
+        command += ['-i', audio_path]
+    if subtitles_path:
+        command += ['-vf', f'ass={subtitles_path}']
+    command += encoder_args(preset)
+    if audio_path:
+        command += ['-map', '0:v', '-map', '1:a', '-c:a', 'aac']
+    return command + [output_video]
+
+def write_runs(renderer, runs, stream, progress=None):
+    """Menyusun frame awal setiap run lalu menulisnya sebanyak jumlah frame run tersebut."""
+    for _, frame_count, state in runs:
+        renderer.compose_state(state)
+        # rawvideo tidak membawa timestamp, jadi frame duplikat dikirim ulang
+        # dari buffer yang sama tanpa menyusunnya kembali. Data pipe tetap
+        # jumlah_frame x ukuran frame; untuk memangkasnya pakai format pipe yuv420p.
+        # Waktu tulis yang lama berarti ffmpeg belum sempat membaca (backpressure).
+        with trace.span("pipe.write", "io"):
+            for _ in range(frame_count):
+                renderer.compositor.write_to(stream)
+        trace.count("pipe.bytes", frame_count * renderer.compositor.frame_nbytes)
+        trace.count("frames.written", frame_count)
+        if progress is not None:
+            progress.update(frame_count)
+
+def run_encoder(command, write_frames, label):
+    """
+    Menjalankan `command` (ffmpeg yang membaca frame dari stdin) dan memanggil
+    `write_frames(stdin)`. Jika ffmpeg berhenti lebih awal (codec tidak
+    dikenal, file audio hilang, ...), penulisan frame berikutnya gagal dengan
+    BrokenPipeError; kegagalan ffmpeg selalu dilaporkan sebagai RuntimeError
+    berisi kode keluar dan pesan stderr-nya.
+    """
+    # stderr ditampung di file, bukan pipe, agar ffmpeg tidak pernah tertahan menulis log.
+    with tempfile.TemporaryFile() as stderr_log:
+        pipe = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr_log)
+        trace.count("subprocess.spawned")
+        write_error = None
+        try:
+            write_frames(pipe.stdin)
+        except OSError as e:  # termasuk BrokenPipeError
+            write_error = e
+        finally:
+            try:
+                pipe.stdin.close()
+            except OSError:
+                pass
+            with trace.span("ffmpeg.finish", "io"):
+                returncode = pipe.wait()
+        if returncode != 0:
+            stderr_log.seek(0)
+            message = stderr_log.read().decode("utf-8", "replace").strip()[-FFMPEG_ERROR_TAIL:]
+            raise RuntimeError(f"ffmpeg gagal meng-encode {label} (kode {returncode}): {message}") from write_error
+    if write_error is not None:
+        raise write_error
+
+def render_all(timeline, output_video, sprite_cache=None, schedule=None, workers=1, seed=None, segments=None,
+               audio_path=None, subtitles_path=None):
+    """
+    Merender timeline menjadi video.
+
+    Secara default hasilnya video tanpa audio. Dengan `audio_path`/`subtitles_path`,
+    proses ffmpeg yang sama langsung me-mux audio dan mem-burn subtitle sehingga
+    video akhir cukup di-encode sekali.
 
-            modified_svg = svg_to_render
-            
-            # --- Terapkan Animasi ---
-            
-            # 1. Animasi Mulut
-            mouth_style = 'transform: scaleY(0.1); transform-origin: center;'
-            if is_speaker and (local_frame_index % 8) < 4:
-                mouth_style = 'transform: scaleY(1);'
-            modified_svg = set_element_style(modified_svg, 'mouth', mouth_style)
-
-            # 2. Animasi Kedipan
-            eye_style = 'transform: scaleY(1);' # Default mata terbuka
-            is_blinking = global_frame_index >= blink_schedules[char_id] and global_frame_index < blink_schedules[char_id] + BLINK_DURATION_FRAMES
-            if is_blinking:
-                eye_style = 'transform: scaleY(0.05); transform-origin: center;'
-            modified_svg = set_element_style(modified_svg, 'eyes', eye_style)
-
-            # Jadwalkan ulang kedipan setelah selesai
-            if global_frame_index >= blink_schedules[char_id] + BLINK_DURATION_FRAMES:
-                next_blink_delay = random.uniform(BLINK_INTERVAL_SECONDS * 0.5, BLINK_INTERVAL_SECONDS * 1.5) * FPS
-                blink_schedules[char_id] = global_frame_index + int(next_blink_delay)
-
-            char_render_w = int(W * 0.3)
-            char_render_h = int(char_render_w * 1.5)
-            char_img = svg_to_pil(modified_svg, char_render_w, char_render_h)
-            
-            pos_x = character_positions[char_id]
-            pos_y = H - char_img.size[1] - int(H * 0.05)
-            final_pos_x = pos_x - char_img.size[0] // 2
-            final_pos_x = max(0, min(final_pos_x, W - char_img.size[0]))
-            
-            frame.paste(char_img, (final_pos_x, pos_y), char_img)
-
-        pipe.stdin.write(frame.tobytes())
-
-    pipe.stdin.close()
-    pipe.wait()
-    if os.path.exists("temp"):
-        import shutil
-        shutil.rmtree("temp")
+    `workers` > 1 membagi frame ke beberapa proses. `segments` ("scene" atau
+    jumlah frame per potongan) meng-encode tiap potongan ke file terpisah secara
+    paralel lalu menyambungnya dengan concat demuxer.
+    """
+    W, H = timeline["width"], timeline["height"]
+    if schedule is None:
+        schedule = SceneSchedule.from_timeline(timeline)
+    if seed is None:
+        seed = timeline.get("seed", DEFAULT_SEED)
+
+    if segments:
+        if audio_path or subtitles_path:
+            raise ValueError("Mode segmen tidak mendukung perakitan satu kali; gabungkan audio & subtitle setelah concat.")
+        from scripts.segment_render import render_segmented
+        render_segmented(timeline, output_video, schedule, seed, segments, workers)
+        print("✅ Rendering video percakapan selesai.")
+        return
+
+    command = encoder_command(W, H, schedule.fps, output_video, audio_path=audio_path, subtitles_path=subtitles_path,
+                              preset=timeline.get("encoder_preset"), pixel_format=pipe_pixel_format(timeline))
+
+    def write_frames(stream):
+        with trace.span("render.plan", "render"):
+            renderer = FrameRenderer(timeline, schedule, seed, sprite_cache)
+            runs = renderer.plan_runs()
+        print(f"   -> {len(runs)} frame unik dari {schedule.total_frames} frame.")
+
+        progress = tqdm(total=schedule.total_frames, desc="🎥 Merender Video")
+        try:
+            if workers > 1:
+                from scripts.parallel_render import render_parallel
+                render_parallel(timeline, schedule, seed, runs, stream, workers, progress)
+            else:
+                write_runs(renderer, runs, stream, progress)
+                cache = renderer.sprite_cache
+                print(f"   -> Sprite cache: {cache.misses} rasterisasi, {cache.hits} dipakai ulang.")
+        finally:
+            progress.close()
+
+    # ffmpeg dijalankan lebih dulu sehingga start-up-nya tumpang tindih dengan perencanaan frame.
+    run_encoder(command, write_frames, f"'{output_video}'")
     print("✅ Rendering video percakapan selesai.")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python render_frames_pipe.py <path_to_timeline.json>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Merender timeline menjadi video tanpa audio.")
+    parser.add_argument("timeline", help="Path ke timeline.json")
+    parser.add_argument("--output", default="output.mp4", help="Path video keluaran")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses render paralel (1 = serial)")
+    parser.add_argument("--segments", default=None,
+                        help="Render per segmen: 'scene' atau jumlah frame per segmen")
+    args = parser.parse_args()
 
-    timeline_path = sys.argv[1]
-    output_video_path = "output.mp4" 
+    timeline_path = args.timeline
+    output_video_path = args.output
 
     try:
         with open(timeline_path, 'r', encoding='utf-8') as f:
@@ -187,4 +574,4 @@ if __name__ == "__main__":
         print(f"Error: Could not decode JSON from {timeline_path}")
         sys.exit(1)
 
-    render_all(timeline_data, output_video_path)
+    render_all(timeline_data, output_video_path, workers=args.workers, segments=parse_segments(args.segments))
@@ -0,0 +1,51 @@
+import numpy as np
+
+# FPS bawaan jika timeline tidak menyebutkan "fps".
+DEFAULT_FPS = 24
+
+
+class SceneSchedule:
+    """
+    Jadwal frame per adegan yang dihitung sekali per render.
+
+    Batas adegan dihitung dari jumlah kumulatif durasi lalu dibulatkan ke frame
+    (`round(t_akhir * fps)`), sehingga pembulatan tidak menumpuk dan video tetap
+    sejajar dengan audio sepanjang apa pun naskahnya. Ini satu-satunya tempat
+    yang memetakan frame global ke adegan: renderer dan subtitle menelusuri
+    adegan lewat `iter_scenes`.
+    """
+
+    def __init__(self, scenes, fps=DEFAULT_FPS):
+        self.scenes = scenes
+        self.fps = fps
+
+        self.durations = np.array([max(float(s.get("duration") or 0), 0.0) for s in scenes], dtype=np.float64)
+        boundaries = np.round(np.concatenate(([0.0], np.cumsum(self.durations))) * fps).astype(np.int64)
+        self.start_frames = boundaries[:-1]
+        self.end_frames = boundaries[1:]
+        self.frame_counts = self.end_frames - self.start_frames
+        self.total_frames = int(boundaries[-1])
+
+    @classmethod
+    def from_timeline(cls, timeline):
+        """Jadwal dengan fps milik timeline (DEFAULT_FPS jika tidak ada)."""
+        fps = timeline.get("fps") or DEFAULT_FPS
+        if float(fps).is_integer():
+            fps = int(fps)
+        return cls(timeline["scenes"], fps)
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def iter_scenes(self):
+        """Menghasilkan (indeks, adegan, frame_awal, frame_akhir) untuk adegan yang punya frame."""
+        for i, scene in enumerate(self.scenes):
+            start, end = int(self.start_frames[i]), int(self.end_frames[i])
+            if end > start:
+                yield i, scene, start, end
+
+    def start_seconds(self, i):
+        return self.start_frames[i] / self.fps
+
+    def end_seconds(self, i):
+        return self.end_frames[i] / self.fps
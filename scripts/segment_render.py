@@ -0,0 +1,125 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from tqdm import tqdm
+
+from scripts import trace
+from scripts.parallel_render import pool_context
+from scripts.render_frames_pipe import FrameRenderer, encoder_command, run_encoder, write_runs
+
+# Berapa kali sebuah segmen yang gagal dicoba ulang sebelum render dibatalkan.
+SEGMENT_RETRIES = 2
+
+# Renderer per proses worker, dibuat sekali lalu dipakai untuk semua segmennya.
+_worker_renderer = None
+
+
+def plan_segments(schedule, segments="scene"):
+    """
+    Membagi rentang frame menjadi segmen [awal, akhir).
+
+    `segments="scene"` menghasilkan satu segmen per adegan; bilangan bulat
+    menghasilkan potongan dengan jumlah frame tetap. Batas segmen selalu berupa
+    batas frame dari `schedule`, sehingga setelah disambung video tetap sejajar
+    dengan audio hasil concat di main.py.
+    """
+    if segments == "scene":
+        return [(start, end) for _, _, start, end in schedule.iter_scenes()]
+    return [(start, min(start + segments, schedule.total_frames))
+            for start in range(0, schedule.total_frames, segments)]
+
+
+def _init_worker(timeline, schedule, seed, tracing=False):
+    global _worker_renderer
+    if tracing:
+        trace.enable()
+    _worker_renderer = FrameRenderer(timeline, schedule, seed)
+
+
+def _render_segment(start, end, segment_path, subtitles_path=None):
+    """
+    Merender frame [start, end) ke file segmen tersendiri lewat proses ffmpeg
+    miliknya. `subtitles_path` (opsional) di-burn langsung ke segmen.
+    Mengembalikan (jumlah frame, data trace worker atau None).
+    """
+    renderer = _worker_renderer
+    command = encoder_command(renderer.width, renderer.height, renderer.schedule.fps, segment_path,
+                              loglevel="error", subtitles_path=subtitles_path, preset=renderer.encoder_preset,
+                              pixel_format=renderer.pixel_format)
+    with trace.span("segment.render", "render", start=start, end=end):
+        run_encoder(command, lambda stream: write_runs(renderer, renderer.plan_runs(start, end), stream),
+                    f"segmen {segment_path}")
+    return end - start, trace.collect() if trace.is_enabled() else None
+
+
+def concat_segments(segment_paths, output_video):
+    """Menyambung segmen-segmen video tanpa encode ulang (concat demuxer, -c copy)."""
+    list_path = output_video + ".concat.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    trace.count("subprocess.spawned")
+    try:
+        with trace.span("segment.concat", "io"):
+            subprocess.run([
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-c", "copy", output_video
+            ], check=True)
+    finally:
+        os.remove(list_path)
+
+
+def render_segment_tasks(timeline, schedule, seed, tasks, workers=1, retries=SEGMENT_RETRIES):
+    """
+    Merender daftar tugas `(start, end, segment_path, subtitles_path)` secara
+    paralel. Segmen yang gagal dicoba ulang hingga `retries` kali tanpa mengulang
+    segmen lain.
+    """
+    if not tasks:
+        return
+    progress = tqdm(total=sum(end - start for start, end, _, _ in tasks), desc="🎥 Merender Segmen")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            mp_context=pool_context(),
+            initializer=_init_worker,
+            initargs=(timeline, schedule, seed, trace.is_enabled()),
+        ) as pool:
+            attempts = {}
+            futures = {}
+            for i, task in enumerate(tasks):
+                futures[pool.submit(_render_segment, *task)] = i
+                attempts[i] = 1
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = futures.pop(future)
+                    try:
+                        frame_count, trace_data = future.result()
+                        trace.merge(trace_data)
+                        progress.update(frame_count)
+                    except Exception as e:
+                        if attempts[i] > retries:
+                            raise RuntimeError(f"Segmen {i} tetap gagal setelah {attempts[i]} percobaan: {e}") from e
+                        print(f"⚠️ Segmen {i} gagal ({e}), mencoba ulang...")
+                        attempts[i] += 1
+                        futures[pool.submit(_render_segment, *tasks[i])] = i
+    finally:
+        progress.close()
+
+def render_segmented(timeline, output_video, schedule, seed, segments="scene", workers=1, retries=SEGMENT_RETRIES):
+    """Merender setiap segmen ke file .mp4 sendiri secara paralel, lalu menyambungnya."""
+    segment_dir = os.path.join(os.path.dirname(output_video) or ".", "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+    ranges = plan_segments(schedule, segments)
+    segment_paths = [os.path.join(segment_dir, f"segment_{i:05d}.mp4") for i in range(len(ranges))]
+    print(f"   -> {len(ranges)} segmen dirender dengan {workers} proses.")
+
+    tasks = [(start, end, path, None) for (start, end), path in zip(ranges, segment_paths)]
+    render_segment_tasks(timeline, schedule, seed, tasks, workers, retries)
+    concat_segments(segment_paths, output_video)
+    shutil.rmtree(segment_dir, ignore_errors=True)
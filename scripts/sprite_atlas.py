@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import tempfile
+import uuid
+
+import numpy as np
+
+from scripts.cache import file_digest
+
+# Atlas sprite: semua pose karakter (setiap varian SVG x tingkat mulut x
+# kedipan) untuk satu ukuran sprite, dikemas menjadi satu strip RGBA
+# premultiplied (.npy) ditambah indeks JSON berisi persegi panjang tiap pose.
+# Renderer me-memory-map strip ini sekali per proses; setiap sprite adalah view
+# NumPy tanpa salinan, dan beberapa proses worker berbagi halaman fisik yang sama
+# lewat page cache.
+ATLAS_DIR = "cache/atlas"
+# Naikkan jika cara merender pose berubah sehingga atlas lama tidak lagi valid.
+ATLAS_FORMAT_VERSION = 1
+CHARACTERS_PATH = "characters.json"
+
+# Atlas yang sudah dibuka di proses ini, per ukuran sprite:
+# {(w, h): (mtime indeks, {path SVG sumber: mtime}, SpriteAtlas | None)}.
+_atlases = {}
+
+
+def atlas_index_path(sprite_w, sprite_h):
+    return os.path.join(ATLAS_DIR, f"sprites_{sprite_w}x{sprite_h}.json")
+
+
+class SpriteAtlas:
+    """
+    Strip sprite yang di-memory-map beserta indeksnya.
+
+    `get(svg_path, mouth_level, is_blinking)` mengembalikan view read-only ke
+    dalam strip, atau None jika pose tersebut tidak ada di atlas atau file SVG
+    sumbernya sudah berubah sejak atlas dibangun.
+    """
+
+    def __init__(self, strip, index):
+        self.strip = strip
+        self.rects = {}
+        stale = {path for path, digest in index["sources"].items() if file_digest(path) != digest}
+        for entry in index["entries"]:
+            if entry["svg"] in stale:
+                continue
+            x, y, w, h = entry["rect"]
+            self.rects[(entry["svg"], entry["mouth"], entry["blink"])] = (x, y, w, h)
+        if stale:
+            print(f"⚠️ {len(stale)} SVG berubah sejak atlas dibangun; pose-nya dirender ulang.")
+
+    def __len__(self):
+        return len(self.rects)
+
+    def get(self, svg_path, mouth_level, is_blinking):
+        rect = self.rects.get((svg_path, mouth_level, bool(is_blinking)))
+        if rect is None:
+            return None
+        x, y, w, h = rect
+        return self.strip[y:y + h, x:x + w]
+
+
+def _source_mtimes(paths):
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.path.getmtime(path)
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+def load_atlas(sprite_w, sprite_h):
+    """
+    Membuka atlas untuk ukuran sprite ini, atau None jika belum dibangun. Atlas
+    dibuka ulang jika indeksnya atau salah satu SVG sumbernya berubah (mtime),
+    sehingga proses yang berumur panjang (render daemon) tidak terus memakai
+    pose dari SVG lama.
+    """
+    index_path = atlas_index_path(sprite_w, sprite_h)
+    try:
+        mtime = os.path.getmtime(index_path)
+    except FileNotFoundError:
+        return None
+    cached = _atlases.get((sprite_w, sprite_h))
+    if cached is not None and cached[0] == mtime and _source_mtimes(cached[1]) == cached[1]:
+        return cached[2]
+
+    atlas = None
+    sources = {}
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == ATLAS_FORMAT_VERSION:
+            # mtime dibaca sebelum digest diperiksa: SVG yang berubah sesudahnya tetap terdeteksi.
+            sources = _source_mtimes(index["sources"])
+            atlas = SpriteAtlas(np.load(os.path.join(ATLAS_DIR, index["strip"]), mmap_mode="r"), index)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Atlas sprite {index_path} tidak bisa dibuka: {e}")
+    _atlases[(sprite_w, sprite_h)] = (mtime, sources, atlas)
+    return atlas
+
+
+def build_atlas(characters_data, sprite_w, sprite_h):
+    """
+    Merasterisasi setiap pose karakter di `characters_data` pada ukuran sprite
+    ini dan menuliskannya sebagai satu strip vertikal + indeks. Setiap build
+    menulis strip bernama unik yang dirujuk oleh indeks, dan indeks diganti secara
+    atomik paling akhir; proses yang masih memetakan strip lama tidak terganggu.
+    Mengembalikan jumlah pose.
+    """
+    from scripts.audio_envelope import MOUTH_LEVELS
+    from scripts.render_frames_pipe import load_svg_template, render_pose
+
+    # Varian emosi yang memakai file SVG sama cukup disimpan sekali.
+    unique = {}
+    sources = {}
+    for char in characters_data.get("characters", []):
+        for emotion, svg_path in sorted(char.get("svgs", {}).items()):
+            template = load_svg_template(svg_path)
+            if template is None:
+                print(f"⚠️ SVG {char['id']} ({emotion}) tidak ditemukan di '{svg_path}', dilewati.")
+                continue
+            sources[svg_path] = file_digest(svg_path)
+            for mouth_level in range(MOUTH_LEVELS):
+                for is_blinking in (False, True):
+                    unique.setdefault((svg_path, mouth_level, is_blinking), (char["id"], emotion, template))
+
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+    prefix = f"sprites_{sprite_w}x{sprite_h}-"
+    strip_name = f"{prefix}{uuid.uuid4().hex[:12]}.npy"
+    fd, temp_strip = tempfile.mkstemp(dir=ATLAS_DIR, suffix=".tmp")
+    os.close(fd)
+    entries = []
+    try:
+        strip = np.lib.format.open_memmap(temp_strip, mode="w+", dtype=np.uint8,
+                                          shape=(len(unique) * sprite_h, sprite_w, 4))
+        for i, ((svg_path, mouth_level, is_blinking), (char_id, emotion, template)) in enumerate(unique.items()):
+            sprite = render_pose(template, mouth_level, is_blinking, sprite_w, sprite_h)
+            y = i * sprite_h
+            strip[y:y + sprite_h] = sprite
+            entries.append({
+                "character": char_id, "emotion": emotion, "svg": svg_path,
+                "mouth": mouth_level, "blink": is_blinking,
+                "rect": [0, y, sprite_w, sprite_h],
+            })
+        strip.flush()
+        del strip
+        os.replace(temp_strip, os.path.join(ATLAS_DIR, strip_name))
+    except BaseException:
+        if os.path.exists(temp_strip):
+            os.remove(temp_strip)
+        raise
+
+    index = {"version": ATLAS_FORMAT_VERSION, "width": sprite_w, "height": sprite_h,
+             "strip": strip_name, "sources": sources, "entries": entries}
+    fd, temp_index = tempfile.mkstemp(dir=ATLAS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, ensure_ascii=False)
+    os.replace(temp_index, atlas_index_path(sprite_w, sprite_h))
+
+    # Strip lama boleh dihapus: pemetaan yang masih terbuka tetap valid sampai ditutup.
+    for name in os.listdir(ATLAS_DIR):
+        if name.startswith(prefix) and name.endswith(".npy") and name != strip_name:
+            os.remove(os.path.join(ATLAS_DIR, name))
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Membangun atlas sprite karakter untuk setiap resolusi render.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--characters", default=CHARACTERS_PATH)
+    args = parser.parse_args(argv)
+
+    import main as pipeline
+    from scripts.render_frames_pipe import character_render_size
+
+    with open(args.characters, encoding="utf-8") as f:
+        characters_data = json.load(f)
+    print(f"🧩 Membangun atlas sprite di {ATLAS_DIR}...")
+    for width, height in pipeline.render_resolutions():
+        sprite_w, sprite_h = character_render_size(width)
+        count = build_atlas(characters_data, sprite_w, sprite_h)
+        print(f"   -> {width}x{height}: {count} pose ({sprite_w}x{sprite_h}).")
+    print("✅ Atlas sprite selesai.")
+
+
+if __name__ == "__main__":
+    main()
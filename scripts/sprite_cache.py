@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+from scripts import trace
+
+# Batas memori default untuk sprite yang disimpan (dalam byte).
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def sprite_nbytes(sprite):
+    """Memperkirakan ukuran memori sebuah sprite (array NumPy atau gambar PIL)."""
+    nbytes = getattr(sprite, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    width, height = sprite.size
+    return width * height * len(sprite.getbands())
+
+
+class SpriteCache:
+    """
+    Cache LRU untuk sprite karakter yang sudah dirasterisasi.
+
+    Kunci berupa tuple pose, misalnya (id karakter, varian SVG, status mulut,
+    status mata, ukuran render), sehingga setiap pose unik cukup dirasterisasi
+    sekali lalu dipakai ulang. Entri yang paling lama tidak dipakai dibuang
+    ketika total ukuran melewati `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, sprite):
+        nbytes = sprite_nbytes(sprite)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        self._entries[key] = (sprite, nbytes)
+        self.current_bytes += nbytes
+        self._evict()
+
+    def get_or_render(self, key, render_fn):
+        """Mengembalikan sprite dari cache, atau merendernya lewat `render_fn()` jika belum ada."""
+        sprite = self.get(key)
+        if sprite is not None:
+            self.hits += 1
+            trace.count("sprite_cache.hit")
+            return sprite
+        self.misses += 1
+        trace.count("sprite_cache.miss")
+        sprite = render_fn()
+        self.put(key, sprite)
+        return sprite
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _evict(self):
+        # Selalu sisakan entri terbaru meskipun ukurannya sendiri melebihi batas.
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
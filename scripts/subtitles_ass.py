@@ -1,4 +1,10 @@
 import os
+from scripts.scene_schedule import SceneSchedule
+
+# Resolusi acuan subtitle (PlayResX/PlayResY). libass menskalakannya ke resolusi
+# video, sehingga ukuran teks relatif sama di resolusi atau tingkat kualitas apa pun.
+PORTRAIT_PLAY_RES = (720, 1280)
+LANDSCAPE_PLAY_RES = (1280, 720)
 
 def sec_to_ass(t):
     """Konversi detik ke format waktu ASS (H:MM:SS.cs)."""
@@ -12,11 +18,10 @@ def escape_ass(text: str) -> str:
     # Menghindari masalah dengan kurung kurawal yang digunakan untuk tag override ASS
     return text.replace("{", "\\{").replace("}", "\\}")
 
-def build_ass(timeline, out_path="output/subtitles.ass"):
-    """
-    Membangun file subtitle berformat .ass dari data timeline.
-    """
-    W, H = timeline.get("width", 720), timeline.get("height", 1280)
+def ass_header(timeline):
+    """Bagian [Script Info] & [V4+ Styles] (satu style per karakter) dari file ASS."""
+    video_w, video_h = timeline.get("width", 720), timeline.get("height", 1280)
+    W, H = LANDSCAPE_PLAY_RES if video_w > video_h else PORTRAIT_PLAY_RES
 
     header = f"""[Script Info]
 Title: Subtitle Otomatis by Kayeskyanima
@@ -49,35 +54,42 @@ Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour,
             f"Style: {c['id']},Arial,{font_size},{ass_color},&H00FFFFFF,&H00000000,&H80000000,0,0,0,0,100,100,0.00,0.00,1,2,1,2,10,10,{vertical_margin},1"
         )
 
+    return header + "\n".join(styles)
+
+def dialogue_event(scene, start_seconds, end_seconds):
+    processed_text = escape_ass(scene["text"])
+    return f"Dialogue: 0,{sec_to_ass(start_seconds)},{sec_to_ass(end_seconds)},{scene['speaker']},,0,0,0,,{processed_text}"
+
+def ass_document(timeline, events):
     events_header = """
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
-    events = []
-    current_time = 0.0
-    for scene in timeline["scenes"]:
-        if not scene.get("duration") or scene["duration"] <= 0:
-            continue
-
-        start_time = sec_to_ass(current_time)
-        end_time = sec_to_ass(current_time + scene["duration"])
-        
-        current_time += scene["duration"]
-
-        processed_text = escape_ass(scene["text"])
-
-        events.append(
-            f"Dialogue: 0,{start_time},{end_time},{scene['speaker']},,0,0,0,,{processed_text}"
-        )
+    return ass_header(timeline) + events_header + "\n".join(events)
 
+def write_ass(timeline, events, out_path):
     output_dir = os.path.dirname(out_path)
-    if not os.path.exists(output_dir):
+    if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write(header)
-        f.write("\n".join(styles))
-        f.write(events_header)
-        f.write("\n".join(events))
+        f.write(ass_document(timeline, events))
 
+def build_ass(timeline, out_path="output/subtitles.ass", schedule=None):
+    """
+    Membangun file subtitle berformat .ass dari data timeline.
+    Waktu mulai/selesai diambil dari `schedule` (SceneSchedule) agar subtitle
+    memakai batas frame yang persis sama dengan video.
+    """
+    if schedule is None:
+        schedule = SceneSchedule.from_timeline(timeline)
+    events = [
+        dialogue_event(scene, schedule.start_seconds(i), schedule.end_seconds(i))
+        for i, scene, _, _ in schedule.iter_scenes()
+    ]
+    write_ass(timeline, events, out_path)
     print(f"✅ Subtitle berhasil dibuat di: {out_path}")
+
+def scene_ass(timeline, scene, duration):
+    """Isi file ASS untuk satu adegan dengan waktu relatif terhadap awal adegan (di-burn per segmen)."""
+    return ass_document(timeline, [dialogue_event(scene, 0.0, duration)])
@@ -1,105 +1,91 @@
-from lxml import etree
 import math
-from copy import deepcopy
 
-NS = {"svg": "http://www.w3.org/2000/svg"}
+from scripts import trace
+from scripts.animation_rig import HEAD_NOD_CURVES, WALK_ARM_SWING, WALK_BOB, WALK_LEG_SWING, WALK_SPEED
+
+# Setiap fungsi apply_* di bawah mengisi dict `overrides` berbentuk
+# {(id_elemen, atribut): nilai} yang kemudian diterapkan sekaligus oleh
+# SvgTemplate.render(). Id yang tidak ada di SVG karakter otomatis diabaikan.
+# Untuk satu frame; renderer memakai AnimationRig (scripts/animation_rig.py)
+# yang mengevaluasi kurva yang sama untuk seluruh adegan sekaligus.
 
 # =====================
 # GESTURE
 # =====================
-def apply_gesture(root, gesture, frame, fps):
+def apply_gesture(overrides, gesture, frame, fps):
     if gesture == "raise_hand":
-        hands = root.xpath("//*[@id='hand_right']", namespaces=NS)
-        if hands:
-            hands[0].attrib["transform"] = "rotate(-25 256 250)"
+        overrides[("hand_right", "transform")] = "rotate(-25 256 250)"
 
     elif gesture == "walk":
         t = frame / fps
         # Body bobbing
-        body = root.xpath("//*[@id='body_group']", namespaces=NS)
-        if body:
-            y_offset = math.sin(t * 5) * 4
-            body[0].attrib["transform"] = f"translate(0 {y_offset})"
+        y_offset = math.sin(t * WALK_SPEED) * WALK_BOB
+        overrides[("body_group", "transform")] = f"translate(0 {y_offset})"
 
         # Leg movement
-        leg_l = root.xpath("//*[@id='leg_left']", namespaces=NS)
-        leg_r = root.xpath("//*[@id='leg_right']", namespaces=NS)
-        if leg_l and leg_r:
-            angle = math.sin(t * 5) * 20
-            leg_l[0].attrib["transform"] = f"rotate({angle} 256 370)"
-            leg_r[0].attrib["transform"] = f"rotate({-angle} 256 370)"
+        angle = math.sin(t * WALK_SPEED) * WALK_LEG_SWING
+        overrides[("leg_left", "transform")] = f"rotate({angle} 256 370)"
+        overrides[("leg_right", "transform")] = f"rotate({-angle} 256 370)"
 
         # Arm swing
-        hand_l = root.xpath("//*[@id='hand_left']", namespaces=NS)
-        hand_r = root.xpath("//*[@id='hand_right']", namespaces=NS)
-        if hand_l and hand_r:
-            angle = math.sin(t * 5) * 15
-            hand_l[0].attrib["transform"] = f"rotate({-angle} 256 250)"
-            hand_r[0].attrib["transform"] = f"rotate({angle} 256 250)"
+        angle = math.sin(t * WALK_SPEED) * WALK_ARM_SWING
+        overrides[("hand_left", "transform")] = f"rotate({-angle} 256 250)"
+        overrides[("hand_right", "transform")] = f"rotate({angle} 256 250)"
 
 # =====================
 # BLINK
 # =====================
-def apply_blink(root, frame, fps):
+def apply_blink(overrides, frame, fps):
     blink_interval = fps * 4     # tiap ±4 detik
     blink_len = 2                # 2 frame
 
     blinking = (frame % blink_interval) < blink_len
 
     for eye_id in ("eye_left", "eye_right"):
-        eyes = root.xpath(f"//*[@id='{eye_id}']", namespaces=NS)
-        if not eyes:
-            continue
-        eyes[0].attrib["r"] = "1" if blinking else "6"
+        overrides[(eye_id, "r")] = "1" if blinking else "6"
 
 
 # =====================
 # HEAD NOD
 # =====================
-def apply_head_nod(root, frame, fps, emotion):
-    heads = root.xpath("//*[@id='head_group']", namespaces=NS)
-    if not heads:
-        return
-
+def apply_head_nod(overrides, frame, fps, emotion):
     t = frame / fps
 
-    if emotion == "thinking":
-        angle = math.sin(t * 1.5) * 6
-    elif emotion == "happy":
-        angle = math.sin(t * 2.5) * 4
-    elif emotion == "angry":
-        angle = math.sin(t * 8) * 1.5
-    else:
-        angle = 0
+    amplitude, speed = HEAD_NOD_CURVES.get(emotion, (0, 0))
+    angle = math.sin(t * speed) * amplitude
 
-    heads[0].attrib["transform"] = f"rotate({angle:.2f} 256 180)"
+    overrides[("head_group", "transform")] = f"rotate({angle:.2f} 256 180)"
 
 
 # =====================
 # MOUTH (LIP SYNC)
 # =====================
-def apply_mouth(root, mouth_open):
-    mouths = root.xpath("//*[@id='mouth']", namespaces=NS)
-    if not mouths:
-        return
-
-    base_y = 210
-    delta = int(mouth_open * 18)
-    mouths[0].attrib["d"] = f"M236 200 Q256 {base_y + delta} 276 200"
+def apply_mouth(overrides, mouth_open):
+    # Path mulut berpusat di (0, 0) dalam mouth-group, jadi skala vertikal
+    # membuka/menutup mulut tanpa bergantung pada bentuk path-nya.
+    scale = 0.1 + 0.9 * max(0.0, min(1.0, mouth_open))
+    overrides[("mouth", "transform")] = f"scale(1 {scale:.2f})"
+    # transform-origin bawaan aset dihitung cairosvg relatif terhadap viewport,
+    # bukan terhadap mulut, sehingga dihapus agar skala tetap berpusat di (0, 0).
+    overrides[("mouth", "style")] = None
 
 
 # =====================
 # MAIN ENTRY
 # =====================
-def apply_emotion(base_tree, emotion, mouth_open, frame, fps, gesture=None):
-    tree = deepcopy(base_tree)
-    root = tree.getroot()
-
-    apply_blink(root, frame, fps)
-    apply_head_nod(root, frame, fps, emotion)
-    apply_mouth(root, mouth_open)
-
-    if gesture:
-        apply_gesture(root, gesture, frame, fps)
-
-    return tree
+def apply_emotion(template, emotion, mouth_open, frame, fps, gesture=None):
+    """
+    Menerapkan animasi emosi pada SvgTemplate dan mengembalikan string SVG-nya.
+    Template tidak diubah, sehingga bisa dipakai ulang untuk setiap frame.
+    """
+    with trace.span("svg.apply_emotion", "svg"):
+        overrides = {}
+
+        apply_blink(overrides, frame, fps)
+        apply_head_nod(overrides, frame, fps, emotion)
+        apply_mouth(overrides, mouth_open)
+
+        if gesture:
+            apply_gesture(overrides, gesture, frame, fps)
+
+        return template.render(overrides)
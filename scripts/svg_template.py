@@ -0,0 +1,126 @@
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+
+# Daftarkan namespace agar hasil serialisasi tetap memakai tag tanpa prefix.
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+# Id khusus untuk elemen <svg> akar di dalam `overrides`, misalnya
+# {(ROOT_ID, "visibility"): "hidden"}.
+ROOT_ID = ""
+
+# Penanda sementara untuk nilai atribut yang bisa diubah saat kompilasi.
+_SLOT_PATTERN = re.compile(r' ([^\s=]+)="__svgslot(\d+)__"')
+
+
+def _escape_attrib(value):
+    return (
+        str(value)
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("\n", "&#10;")
+    )
+
+
+class SvgTemplate:
+    """
+    SVG yang di-parse sekali dan diindeks berdasarkan id elemen.
+
+    `render(overrides)` menerapkan sekumpulan perubahan atribut sekaligus, dengan
+    `overrides` berupa dict `{(id_elemen, atribut): nilai}` (nilai `None` menghapus
+    atribut). Untuk setiap kombinasi atribut, SVG diserialisasi sekali menjadi
+    potongan-potongan string di sekitar atribut tersebut; render berikutnya cukup
+    menyambung potongan itu dengan nilai baru.
+    """
+
+    def __init__(self, svg_string):
+        self.source = svg_string
+        self.root = ET.fromstring(svg_string)
+        self.elements = {}
+        for element in self.root.iter():
+            element_id = element.get("id")
+            # Jika ada id ganda, elemen pertama yang dipakai (sama seperti findall()[0]).
+            if element_id and element_id not in self.elements:
+                self.elements[element_id] = element
+        self.elements[ROOT_ID] = self.root
+        self._compiled = {}
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read())
+
+    def element_key(self, element):
+        """
+        Id untuk `element` di `overrides`. Elemen tanpa id (atau dengan id ganda)
+        diberi id sintetis yang hanya berlaku di template ini dan tidak pernah
+        muncul di SVG keluaran.
+        """
+        element_id = element.get("id")
+        if element_id and self.elements.get(element_id) is element:
+            return element_id
+        for key, known in self.elements.items():
+            if known is element:
+                return key
+        # NUL tidak boleh ada di XML, jadi tidak mungkin bentrok dengan id asli.
+        key = f"\0{len(self.elements)}"
+        self.elements[key] = element
+        return key
+
+    def has(self, element_id):
+        return element_id in self.elements
+
+    def get(self, element_id, attribute, default=None):
+        element = self.elements.get(element_id)
+        if element is None:
+            return default
+        return element.get(attribute, default)
+
+    def render(self, overrides=None):
+        """Mengembalikan string SVG dengan `overrides` diterapkan. Id yang tidak ada diabaikan."""
+        if not overrides:
+            return self.source
+        slots = tuple(sorted(key for key in overrides if key[0] in self.elements))
+        if not slots:
+            return self.source
+
+        compiled = self._compiled.get(slots)
+        if compiled is None:
+            compiled = self._compile(slots)
+        fragments, order = compiled
+
+        parts = [fragments[0]]
+        for position, slot_index in enumerate(order):
+            attribute = slots[slot_index][1]
+            value = overrides[slots[slot_index]]
+            if value is not None:
+                parts.append(f' {attribute}="{_escape_attrib(value)}"')
+            parts.append(fragments[position + 1])
+        return "".join(parts)
+
+    def _compile(self, slots):
+        originals = []
+        for slot_index, (element_id, attribute) in enumerate(slots):
+            element = self.elements[element_id]
+            originals.append((element, attribute, element.get(attribute)))
+            element.set(attribute, f"__svgslot{slot_index}__")
+        try:
+            text = ET.tostring(self.root, encoding="unicode")
+        finally:
+            for element, attribute, value in originals:
+                if value is None:
+                    del element.attrib[attribute]
+                else:
+                    element.set(attribute, value)
+
+        # split() menghasilkan [potongan, nama_atribut, indeks_slot, potongan, ...]
+        pieces = _SLOT_PATTERN.split(text)
+        fragments = pieces[0::3]
+        order = [int(index) for index in pieces[2::3]]
+        self._compiled[slots] = (fragments, order)
+        return fragments, order
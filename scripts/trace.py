@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Instrumentasi ringan untuk pipeline: span berwaktu dan counter.
+#
+# Saat tidak aktif, `span()` mengembalikan context manager kosong yang sama dan
+# `count()` langsung kembali, jadi biaya di jalur panas hanya satu pengecekan
+# global. Saat aktif, setiap span dicatat sebagai event "complete" (ph="X")
+# format Chrome trace, yang bisa dibuka di chrome://tracing atau Perfetto.
+
+_enabled = False
+_events = []
+_counters = defaultdict(float)
+_counter_lock = threading.Lock()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name, "cat": self.category, "ph": "X",
+            "ts": self.start / 1000, "dur": (end - self.start) / 1000,
+            "pid": os.getpid(), "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        _events.append(event)
+        return False
+
+
+def enable():
+    """Mengaktifkan pencatatan dan mengosongkan data sebelumnya."""
+    global _enabled
+    reset()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _events.clear()
+    with _counter_lock:
+        _counters.clear()
+
+
+def span(name, category="pipeline", **args):
+    """Context manager yang mencatat durasi blok `with` sebagai span bernama `name`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def count(name, value=1):
+    """Menambah counter `name` (cache hit, rasterisasi, byte ke pipe, jumlah subprocess, ...)."""
+    if not _enabled:
+        return
+    with _counter_lock:
+        _counters[name] += value
+
+
+def collect():
+    """Mengambil dan mengosongkan data proses ini, untuk dikirim dari worker ke proses induk."""
+    events = list(_events)
+    with _counter_lock:
+        counters = dict(_counters)
+    reset()
+    return events, counters
+
+
+def merge(data):
+    """Menggabungkan hasil collect() dari proses worker."""
+    if not _enabled or not data:
+        return
+    events, counters = data
+    _events.extend(events)
+    with _counter_lock:
+        for name, value in counters.items():
+            _counters[name] += value
+
+
+def span_stats():
+    """Statistik per nama span: {nama: (jumlah, total_ms, maks_ms)}."""
+    stats = {}
+    for event in _events:
+        calls, total, longest = stats.get(event["name"], (0, 0.0, 0.0))
+        duration = event["dur"] / 1000
+        stats[event["name"]] = (calls + 1, total + duration, max(longest, duration))
+    return stats
+
+
+def export_chrome_trace(path):
+    """Menulis event ke file JSON format Chrome trace, counter akhir disimpan sebagai metadata."""
+    with _counter_lock:
+        counters = dict(_counters)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "traceEvents": _events,
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": counters},
+        }, f)
+
+
+def summary_table():
+    """Ringkasan teks: span diurutkan dari total waktu terbesar, lalu semua counter."""
+    lines = [f"{'span':<28}{'panggilan':>10}{'total ms':>12}{'rata2 ms':>10}{'maks ms':>10}"]
+    lines.append("-" * len(lines[0]))
+    for name, (calls, total, longest) in sorted(span_stats().items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<28}{calls:>10}{total:>12.1f}{total / calls:>10.2f}{longest:>10.1f}")
+    with _counter_lock:
+        counters = sorted(_counters.items())
+    if counters:
+        lines.append("")
+        lines.append(f"{'counter':<28}{'nilai':>12}")
+        lines.append("-" * 40)
+        for name, value in counters:
+            lines.append(f"{name:<28}{value:>12,.0f}")
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from scripts import trace
+from scripts.audio_engine import decode_audio, pitch_shift, write_wav
+from scripts.cache import audio_key, load_cached_pcm, store_cached_pcm
+
+TTS_LANG = "id"
+TTS_BACKEND = "gtts"
+# gTTS menghasilkan audio pada 24kHz; seluruh audio diproses pada rate ini.
+TTS_SAMPLE_RATE = 24000
+# Jumlah permintaan TTS yang boleh berjalan bersamaan (hindari rate limit gTTS).
+DEFAULT_TTS_CONCURRENCY = 4
+
+
+def gtts_synthesize(text, lang):
+    """Sintesis gTTS langsung ke memori, lalu didekode menjadi PCM int16 mono."""
+    from gtts import gTTS
+
+    mp3 = io.BytesIO()
+    gTTS(text, lang=lang, slow=False).write_to_fp(mp3)
+    return decode_audio(mp3.getvalue(), TTS_SAMPLE_RATE)
+
+
+# Backend TTS: fungsi (teks, bahasa) -> PCM int16 mono pada TTS_SAMPLE_RATE.
+TTS_BACKENDS = {
+    "gtts": gtts_synthesize,
+}
+
+
+def synthesize_scene(text, pitch, tts_slots, backend=TTS_BACKEND):
+    """
+    Membuat PCM satu adegan dengan nada karakter sudah diterapkan.
+    Baris yang pernah dibuat diambil dari cache audio tanpa jaringan maupun ffmpeg.
+    """
+    key = audio_key(text, TTS_LANG, backend, pitch)
+    cached = load_cached_pcm(key, TTS_SAMPLE_RATE)
+    if cached is not None:
+        trace.count("audio_cache.hit")
+        return np.frombuffer(cached, dtype=np.int16)
+    trace.count("audio_cache.miss")
+
+    # Hanya pemanggilan TTS yang dibatasi; pengolahan nada boleh berjalan paralel penuh.
+    with trace.span("tts.wait_slot", "audio"):
+        tts_slots.acquire()
+    try:
+        with trace.span("tts.synthesize", "audio", backend=backend):
+            raw = TTS_BACKENDS[backend](text, TTS_LANG)
+    finally:
+        tts_slots.release()
+    pcm = pitch_shift(raw, pitch)
+    store_cached_pcm(key, pcm.tobytes(), TTS_SAMPLE_RATE)
+    return pcm
+
+
+def generate_audio(timeline, characters_map, output_dir, concurrency=DEFAULT_TTS_CONCURRENCY, backend=TTS_BACKEND):
+    """
+    Membuat audio semua adegan secara bersamaan lalu menulisnya ke
+    `output_dir/audio.wav`.
+
+    Sintesis TTS dibatasi `concurrency` permintaan sekaligus, sedangkan pengolahan
+    nada berjalan paralel. Durasi tiap adegan dihitung dari jumlah sampelnya, dan
+    semua klip disalin ke satu buffer PCM yang ditulis sekali. Hasil dikumpulkan
+    sesuai urutan adegan, sehingga urutan audio dan `scene["duration"]` deterministik.
+    """
+    character_pitches = {char_id: data.get("pitch", 1.0) for char_id, data in characters_map.items()}
+    scenes = timeline["scenes"]
+    tts_slots = threading.BoundedSemaphore(max(1, concurrency))
+    post_workers = os.cpu_count() or 1
+
+    jobs = []
+    clips = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency) + post_workers) as pool:
+        for i, scene in enumerate(scenes):
+            speaker = scene.get("speaker")
+            if not speaker or not scene.get("text"):
+                scene["duration"] = 0.0
+                continue
+            pitch = character_pitches.get(speaker, 1.0)
+            jobs.append((i, pool.submit(synthesize_scene, scene["text"], pitch, tts_slots, backend)))
+
+        for done, (i, future) in enumerate(jobs, start=1):
+            pcm = future.result()
+            clips.append(pcm)
+            scenes[i]["duration"] = len(pcm) / TTS_SAMPLE_RATE
+            print(f"  - Adegan {i+1}/{len(scenes)} selesai ({done}/{len(jobs)}): {scenes[i]['speaker']}")
+
+    print("  - Menggabungkan semua klip audio...")
+    with trace.span("audio.concat_write", "audio"):
+        audio = np.empty(sum(len(pcm) for pcm in clips), dtype=np.int16)
+        offset = 0
+        for pcm in clips:
+            audio[offset:offset + len(pcm)] = pcm
+            offset += len(pcm)
+
+        final_audio_path = os.path.join(output_dir, "audio.wav")
+        write_wav(final_audio_path, audio, TTS_SAMPLE_RATE)
+    return final_audio_path
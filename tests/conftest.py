@@ -0,0 +1,88 @@
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+CHARACTER_SVG = os.path.join(REPO_ROOT, "assets", "characters", "Hantu_Dasar.svg")
+BACKGROUND_SVG = os.path.join(REPO_ROOT, "assets", "backgrounds", "Taman.svg")
+
+# ffmpeg palsu untuk pengujian: frame rawvideo dari stdin disalin apa adanya ke
+# file keluaran (concat demuxer menyambung isi file-file segmen), sehingga hasil
+# render bisa dibandingkan byte per byte. Input yang tidak ada membuat ffmpeg
+# langsung keluar dengan kode 1 tanpa membaca stdin, seperti ffmpeg sungguhan.
+FAKE_FFMPEG = """#!{python}
+import os
+import sys
+
+args = sys.argv[1:]
+inputs = [args[i + 1] for i, arg in enumerate(args) if arg == "-i"]
+missing = [path for path in inputs if path != "-" and not os.path.exists(path)]
+if missing:
+    sys.stderr.write(missing[0] + ": No such file or directory\\n")
+    sys.exit(1)
+with open(args[-1], "wb") as out:
+    if "concat" in args:
+        with open(inputs[0], encoding="utf-8") as f:
+            for line in f:
+                with open(line.strip()[len("file '"):-1], "rb") as part:
+                    out.write(part.read())
+    else:
+        out.write(sys.stdin.buffer.read())
+"""
+
+
+@pytest.fixture
+def requires_cairosvg():
+    """Render butuh cairosvg beserta pustaka cairo sistem; tanpa itu pengujian dilewati."""
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError) as e:
+        pytest.skip(f"cairosvg tidak tersedia: {e}")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Direktori kerja sementara, sehingga cache/ (raster, atlas, segmen) tidak memakai milik repo."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    path = bin_dir / "ffmpeg"
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable), encoding="utf-8")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    return path
+
+
+def make_timeline(scenes, width=160, height=240, fps=12, **extra):
+    """Timeline kecil dengan dua karakter hantu dan latar belakang bawaan repo."""
+    characters = [
+        {"id": "A", "pitch": 1.0, "svgs": {"default": CHARACTER_SVG}},
+        {"id": "B", "pitch": 0.8, "svgs": {"default": CHARACTER_SVG}},
+    ]
+    timeline = {
+        "width": width, "height": height, "fps": fps,
+        "background": BACKGROUND_SVG, "characters": characters,
+        "scenes": json.loads(json.dumps(scenes)),
+    }
+    timeline.update(extra)
+    return timeline
+
+
+@pytest.fixture
+def timeline():
+    return make_timeline([
+        {"speaker": "A", "text": "Halo.", "emotion": "happy", "duration": 1.0},
+        {"speaker": "B", "text": "Apa kabar?", "emotion": "neutral", "gesture": "walk", "duration": 1.5},
+        {"speaker": "A", "text": "Baik.", "emotion": "thinking", "duration": 0.75},
+    ])
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from scripts.compositor import FrameCompositor, premultiply, rgba_to_yuv420p
+
+WIDTH, HEIGHT = 64, 48
+
+
+def random_sprite(rng, h, w):
+    rgba = rng.integers(0, 256, (h, w, 4), dtype=np.uint8)
+    rgba[rng.random((h, w)) < 0.3, 3] = 0
+    return premultiply(rgba)
+
+
+def frame_sequence():
+    """Urutan lapisan per frame: sprite diam, berganti di tempat, berpindah, tumpang tindih, keluar tepi."""
+    rng = np.random.default_rng(7)
+    a = random_sprite(rng, 20, 14)
+    a_mouth = a.copy()
+    a_mouth[12:15, 5:9] = random_sprite(rng, 3, 4)
+    b = random_sprite(rng, 21, 15)
+    b_blink = b.copy()
+    b_blink[4:6, 3:12] = 0
+    return [
+        [(a, 3, 5, "a"), (b, 30, 20, "b")],
+        [(a, 3, 5, "a"), (b, 30, 20, "b")],
+        [(a_mouth, 3, 5, "a_mouth"), (b, 30, 20, "b")],
+        [(a_mouth, 3, 5, "a_mouth"), (b_blink, 30, 20, None)],
+        [(a, 7, 6, "a"), (b_blink, 30, 20, "b_blink")],
+        [(a, 21, 15, "a"), (b, 30, 20, "b")],
+        [(a, 55, 40, "a"), (b, -4, 33, "b")],
+        [(a_mouth, 55, 40, "a_mouth"), (b, -4, 33, "b")],
+        [(a, 0, 0, "a")],
+        [(a, 1, 1, "a"), (b, 31, 21, "b")],
+        [(a_mouth.copy(), 1, 1, "a_mouth"), (b_blink, 31, 21, "b_blink")],
+        [(a, 1, 1, "a"), (b, 31, 21, "b")],
+    ]
+
+
+@pytest.mark.parametrize("pixel_format", ["rgba", "yuv420p"])
+def test_dirty_rect_compose_matches_full_compose(pixel_format):
+    background = random_sprite(np.random.default_rng(1), HEIGHT, WIDTH)
+    background[..., 3] = 255
+    incremental = FrameCompositor(WIDTH, HEIGHT, background, pixel_format=pixel_format)
+
+    for layers in frame_sequence():
+        incremental.compose(layers)
+        full = FrameCompositor(WIDTH, HEIGHT, background, pixel_format=pixel_format)
+        full.compose(layers)
+        np.testing.assert_array_equal(incremental.frame, full.frame)
+        np.testing.assert_array_equal(incremental.output, full.output)
+
+
+def test_unchanged_frame_redraws_nothing():
+    compositor = FrameCompositor(WIDTH, HEIGHT)
+    layers = frame_sequence()[0]
+    assert compositor.compose(layers) == [(0, 0, WIDTH, HEIGHT)]
+    assert compositor.compose(list(layers)) == []
+
+
+def test_diff_cache_keeps_only_boxes():
+    compositor = FrameCompositor(WIDTH, HEIGHT)
+    for layers in frame_sequence():
+        compositor.compose(layers)
+    assert compositor._diff_boxes
+    for key, box in compositor._diff_boxes.items():
+        assert not any(isinstance(part, np.ndarray) for part in key)
+        assert box is None or all(isinstance(v, int) for v in box)
+
+
+def test_yuv420p_conversion_matches_bt601():
+    rgb = np.random.default_rng(3).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    y = np.empty((HEIGHT, WIDTH), dtype=np.uint8)
+    u = np.empty((HEIGHT // 2, WIDTH // 2), dtype=np.uint8)
+    v = np.empty_like(u)
+    rgba_to_yuv420p(rgb, y, u, v)
+
+    r, g, b = (rgb[..., i].astype(np.float64) for i in range(3))
+    expected_y = 16 + (65.481 * r + 128.553 * g + 24.966 * b) / 255
+    block = rgb.astype(np.float64).reshape(HEIGHT // 2, 2, WIDTH // 2, 2, 3).mean(axis=(1, 3))
+    r, g, b = block[..., 0], block[..., 1], block[..., 2]
+    expected_u = 128 + (-37.797 * r - 74.203 * g + 112.0 * b) / 255
+    expected_v = 128 + (112.0 * r - 93.786 * g - 18.214 * b) / 255
+
+    assert np.abs(y - expected_y).max() <= 1
+    assert np.abs(u - expected_u).max() <= 1
+    assert np.abs(v - expected_v).max() <= 1
@@ -0,0 +1,54 @@
+import numpy as np
+
+from conftest import make_timeline
+from scripts.audio_engine import write_wav
+from scripts.scene_schedule import SceneSchedule
+
+SAMPLE_RATE = 24000
+
+
+def write_scene_audio(path, scenes):
+    """Audio uji: nada sinus per adegan dengan amplitudo `scene["volume"]`."""
+    parts = []
+    for scene in scenes:
+        t = np.arange(int(round(scene["duration"] * SAMPLE_RATE))) / SAMPLE_RATE
+        # Volume berdenyut agar tingkat bukaan mulut bervariasi di dalam adegan.
+        parts.append(scene["volume"] * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)))
+    write_wav(str(path), np.concatenate(parts).astype(np.int16), SAMPLE_RATE)
+
+
+def scene_hashes(timeline):
+    from scripts.incremental_render import scene_hash
+    from scripts.render_frames_pipe import FrameRenderer
+
+    schedule = SceneSchedule.from_timeline(timeline)
+    renderer = FrameRenderer(timeline, schedule, seed=0)
+    return [scene_hash(renderer, i, start, end) for i, _, start, end in schedule.iter_scenes()]
+
+
+def test_scene_hash_is_stable_for_unchanged_scenes(requires_cairosvg, workdir):
+    scenes = [
+        {"speaker": "A", "text": "Halo.", "emotion": "happy", "duration": 1.0, "volume": 3000},
+        {"speaker": "B", "text": "Apa kabar?", "emotion": "neutral", "gesture": "walk", "duration": 4.5,
+         "volume": 8000},
+        {"speaker": "A", "text": "Baik.", "emotion": "thinking", "duration": 3.25, "volume": 5000},
+    ]
+    write_scene_audio(workdir / "before.wav", scenes)
+    before = scene_hashes(make_timeline(scenes, audio=str(workdir / "before.wav")))
+
+    # Adegan pertama lebih panjang & jauh lebih keras; adegan lain tidak berubah.
+    scenes[0].update(text="Halo semuanya, selamat pagi.", duration=2.5, volume=30000)
+    write_scene_audio(workdir / "after.wav", scenes)
+    after = scene_hashes(make_timeline(scenes, audio=str(workdir / "after.wav")))
+
+    assert before[0] != after[0]
+    assert before[1:] == after[1:]
+
+
+def test_scene_hash_changes_with_scene_content(requires_cairosvg, workdir, timeline):
+    before = scene_hashes(timeline)
+    timeline["scenes"][1]["emotion"] = "angry"
+    after = scene_hashes(timeline)
+
+    assert before[0] == after[0] and before[2] == after[2]
+    assert before[1] != after[1]
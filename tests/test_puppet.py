@@ -0,0 +1,59 @@
+import numpy as np
+
+from scripts.animation_rig import AnimationRig
+from scripts.puppet import Puppet, affine_resample, parse_transform, viewbox_matrix
+from scripts.svg_template import SvgTemplate
+
+# Lengan kanan di antara dua saudara statis, di dalam grup dengan transform sendiri.
+SVG = """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 512 768">
+  <defs><linearGradient id="shade"/></defs>
+  <g id="figure" transform="translate(40 30) scale(0.8)">
+    <rect id="torso" x="200" y="200" width="120" height="200"/>
+    <g id="arm_right" transform="translate(12 -6) rotate(5 327 270)">
+      <rect x="320" y="260" width="30" height="120"/>
+    </g>
+    <rect id="sleeve" x="300" y="250" width="50" height="40"/>
+  </g>
+</svg>"""
+
+
+def make_puppet(width=128, height=192):
+    template = SvgTemplate(SVG)
+    return template, Puppet(template, AnimationRig(template), width, height)
+
+
+def test_layers_follow_document_order():
+    template, puppet = make_puppet()
+    keys = {key: element.get("id") for key, element in template.elements.items()}
+    stack = [[keys[k] for k in entry] if isinstance(entry, list) else entry for entry in puppet.stack]
+    assert stack == [["torso"], "arm_right", ["sleeve"]]
+
+
+def test_part_matrix_replaces_the_original_transform_in_parent_space():
+    template, puppet = make_puppet()
+    to_pixels = viewbox_matrix(template.root, puppet.width, puppet.height)
+    parent = parse_transform("translate(40 30) scale(0.8)")
+    original = parse_transform("translate(12 -6) rotate(5 327 270)")
+    posed = "rotate(-60 327 270)"
+
+    # Titik di koordinat lokal lengan: posisinya di raster lapisan (transform
+    # bawaan) harus dipetakan ke posisinya jika transform diganti seperti mode SVG.
+    points = np.array([[320, 350, 335], [260, 380, 300], [1, 1, 1]], dtype=np.float64)
+    in_layer = to_pixels @ parent @ original @ points
+    expected = to_pixels @ parent @ parse_transform(posed) @ points
+
+    np.testing.assert_allclose(puppet.part_matrix("arm_right", posed) @ in_layer, expected, atol=1e-9)
+
+
+def test_affine_resample_translation_is_exact():
+    rng = np.random.default_rng(5)
+    raster = np.zeros((20, 24, 4), dtype=np.uint8)
+    raster[4:12, 6:15] = rng.integers(0, 256, (8, 9, 4), dtype=np.uint8)
+    padded = np.zeros((22, 26, 4), dtype=np.float32)
+    padded[1:-1, 1:-1] = raster
+
+    out, x, y = affine_resample(padded, (6, 4, 15, 12), parse_transform("translate(3 2)"), 24, 20)
+    moved = np.zeros_like(raster)
+    moved[y:y + out.shape[0], x:x + out.shape[1]] = out
+    np.testing.assert_array_equal(moved[6:14, 9:18], raster[4:12, 6:15])
+    assert moved.sum() == raster.sum()
@@ -0,0 +1,30 @@
+import pytest
+
+from scripts.compositor import frame_nbytes
+from scripts.scene_schedule import SceneSchedule
+
+
+def render_bytes(workdir, timeline, name, **options):
+    """Merender lewat ffmpeg palsu dan mengembalikan frame rawvideo yang dikirim ke pipe."""
+    from scripts.render_frames_pipe import render_all
+
+    output = workdir / f"{name}.mp4"
+    render_all(timeline, str(output), **options)
+    return output.read_bytes()
+
+
+@pytest.mark.parametrize("pipe_format", ["rgba", "yuv420p"])
+def test_parallel_matches_serial(requires_cairosvg, workdir, fake_ffmpeg, timeline, pipe_format):
+    timeline["pipe_format"] = pipe_format
+    serial = render_bytes(workdir, timeline, "serial")
+    total_frames = SceneSchedule.from_timeline(timeline).total_frames
+    assert len(serial) == total_frames * frame_nbytes(timeline["width"], timeline["height"], pipe_format)
+
+    assert render_bytes(workdir, timeline, "parallel", workers=2) == serial
+
+
+@pytest.mark.parametrize("segments", ["scene", 7])
+def test_segments_match_serial(requires_cairosvg, workdir, fake_ffmpeg, timeline, segments):
+    serial = render_bytes(workdir, timeline, "serial")
+
+    assert render_bytes(workdir, timeline, "segmented", workers=2, segments=segments) == serial
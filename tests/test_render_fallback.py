@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+import main
+
+
+def test_render_all_reports_early_ffmpeg_exit(requires_cairosvg, workdir, fake_ffmpeg, timeline):
+    from scripts.render_frames_pipe import render_all
+
+    # ffmpeg keluar sebelum membaca frame; frame 160x240 RGBA lebih besar dari
+    # buffer pipe sehingga penulisan berikutnya gagal dengan BrokenPipeError.
+    with pytest.raises(RuntimeError, match="missing.wav: No such file"):
+        render_all(timeline, str(workdir / "out.mp4"), audio_path=str(workdir / "missing.wav"))
+
+
+def test_stage_render_falls_back_to_two_step_assembly(requires_cairosvg, workdir, fake_ffmpeg, timeline):
+    job = main.PipelineJob("naskah", {"characters": timeline["characters"]}, str(workdir), timeline=timeline)
+    # audio.wav belum ada, jadi perakitan satu kali gagal di ffmpeg.
+    assert not os.path.exists(job.audio_path)
+
+    main.stage_render(job)
+
+    assert not job.muxed
+    assert os.path.getsize(job.video_noaudio_path) > 0
+    assert not os.path.exists(job.video_path)
+
+
+@pytest.mark.parametrize("quality, preset", [("draft", "ultrafast"), ("final", None)])
+def test_two_step_mux_keeps_the_quality_preset(requires_cairosvg, workdir, monkeypatch, timeline, quality, preset):
+    job = main.PipelineJob("naskah", {"characters": timeline["characters"]}, str(workdir), timeline=timeline,
+                           assembly="two-step", quality=quality)
+    main.stage_analyze(job)
+    commands = []
+    monkeypatch.setattr(main.subprocess, "run", lambda command, **kwargs: commands.append(command))
+
+    main.stage_mux(job)
+
+    (command,) = commands
+    assert "libx264" in command
+    if preset:
+        assert command[command.index("-preset") + 1] == preset
+    else:
+        assert "-preset" not in command
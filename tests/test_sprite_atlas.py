@@ -0,0 +1,25 @@
+import os
+import shutil
+
+from conftest import CHARACTER_SVG
+from scripts import sprite_atlas
+
+
+def test_atlas_drops_poses_of_edited_svgs(requires_cairosvg, workdir, monkeypatch):
+    monkeypatch.setattr(sprite_atlas, "_atlases", {})
+    svg_path = "hantu.svg"
+    shutil.copyfile(CHARACTER_SVG, svg_path)
+    characters = {"characters": [{"id": "A", "svgs": {"default": svg_path}}]}
+
+    sprite_atlas.build_atlas(characters, 40, 60)
+    atlas = sprite_atlas.load_atlas(40, 60)
+    assert atlas.get(svg_path, 0, False) is not None
+    assert sprite_atlas.load_atlas(40, 60) is atlas
+
+    # SVG diubah setelah atlas dibuka (misalnya saat render daemon berjalan).
+    with open(svg_path, "a", encoding="utf-8") as f:
+        f.write("<!-- diubah -->\n")
+    stat = os.stat(svg_path)
+    os.utime(svg_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert sprite_atlas.load_atlas(40, 60).get(svg_path, 0, False) is None